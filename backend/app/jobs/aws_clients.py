@@ -1,31 +1,236 @@
-import os, time, json, uuid
+import io, os, time, json, uuid, queue, atexit, threading
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from django.conf import settings
 
 _session = boto3.session.Session(region_name=settings.AWS_REGION)
-s3 = _session.client("s3")
+# pool de conexões do tamanho do pool de threads de upload
+s3 = _session.client("s3", config=Config(max_pool_connections=settings.S3_UPLOAD_CONCURRENCY))
 sqs = _session.client("sqs")
 dynamodb = _session.resource("dynamodb")
 ddb_table = dynamodb.Table(settings.DDB_TABLE_LOGS)
 
+class AuditLogWriter:
+    """
+    Log de auditoria assíncrono: os eventos vão para uma fila limitada em
+    memória e uma thread grava em lotes de 25 (batch_writer, que já reenvia
+    os UnprocessedItems). Falha do DynamoDB tem retry com backoff; fila
+    cheia descarta o evento (o request não espera pelo log).
+    """
+    BATCH = 25  # limite do BatchWriteItem
+
+    def __init__(self, table, max_queue: int = 10000, flush_interval: float = 1.0, retries: int = 5):
+        self.table = table
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.dropped = 0
+        self._q = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        # thread criada no 1º evento (e de novo depois de um fork)
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+                    self._thread.start()
+
+    def put(self, item: dict):
+        self._ensure_started()
+        try:
+            self._q.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            print(f"[DDB] fila de auditoria cheia, evento descartado ({self.dropped}): "
+                  f"{item['action']} {item['pk']}")
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._q.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.BATCH:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._q.task_done()
+
+    def _write(self, batch: list):
+        for attempt in range(self.retries + 1):
+            try:
+                # regravar o lote é idempotente: mesmo pk/sk sobrescreve
+                with self.table.batch_writer() as bw:
+                    for item in batch:
+                        bw.put_item(Item=item)
+                print(f"[DDB] batch_write {len(batch)} eventos")
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    print(f"[DDB] batch_write falhou, {len(batch)} eventos perdidos: {e}")
+                    return
+                time.sleep(min(5.0, 0.2 * 2 ** attempt))
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a fila esvaziar (ex.: antes de o processo sair)."""
+        deadline = time.time() + timeout
+        while self._q.unfinished_tasks and time.time() < deadline:
+            if self._thread is None or not self._thread.is_alive():
+                break
+            time.sleep(0.05)
+        return not self._q.unfinished_tasks
+
+audit_log = AuditLogWriter(ddb_table,
+                           max_queue=settings.AUDIT_LOG_QUEUE_SIZE,
+                           flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL)
+atexit.register(audit_log.flush)
+
 def log_ddb(actor: str, action: str, pk: str, payload: dict):
+    # sk ordenável por tempo e sem colisão (dois eventos no mesmo ms)
     ts = int(time.time() * 1000)
     item = {
         "pk": f"job#{pk}",
-        "sk": f"ts#{ts}",
+        "sk": f"ts#{ts:013d}#{uuid.uuid4().hex}",
         "actor": actor,
         "action": action,
         "payload": json.dumps(payload),
     }
-    print(f"[DDB] put_item {item}")
-    ddb_table.put_item(Item=item)
+    print(f"[DDB] log {action} {item['pk']}")
+    audit_log.put(item)
+
+# cada upload lê no máximo um bloco por vez (sem threads próprias: o paralelismo é o
+# _upload_pool); pico de memória ~ S3_UPLOAD_CONCURRENCY x S3_MULTIPART_CHUNKSIZE
+_transfer_config = TransferConfig(
+    multipart_threshold=settings.S3_MULTIPART_CHUNKSIZE,
+    multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+    use_threads=False,
+)
 
-def upload_s3_bytes(bucket: str, key: str, data: bytes, content_type: str):
-    print(f"[S3] put_object bucket={bucket} key={key} size={len(data)}")
-    s3.put_object(Bucket=bucket, Key=key, Body=data, ContentType=content_type)
+def upload_s3_fileobj(bucket: str, key: str, fileobj, content_type: str):
+    """Sobe um arquivo (ou bytes) em streaming: multipart acima de S3_MULTIPART_CHUNKSIZE."""
+    if isinstance(fileobj, (bytes, bytearray)):
+        fileobj = io.BytesIO(fileobj)
+    size = getattr(fileobj, "size", None)
+    print(f"[S3] upload_fileobj bucket={bucket} key={key} size={size}")
+    s3.upload_fileobj(fileobj, bucket, key, ExtraArgs={"ContentType": content_type},
+                      Config=_transfer_config)
 
-def enqueue_item(message: dict):
+_upload_pool = ThreadPoolExecutor(max_workers=settings.S3_UPLOAD_CONCURRENCY,
+                                  thread_name_prefix="s3-upload")
+
+def upload_s3_many(bucket: str, uploads: list):
+    """Sobe vários objetos em paralelo. uploads = [(key, arquivo ou bytes, content_type), ...]"""
+    t0 = time.time()
+    futures = [_upload_pool.submit(upload_s3_fileobj, bucket, key, data, ct)
+               for key, data, ct in uploads]
+    for fut in futures:
+        fut.result()  # propaga a primeira falha
+    print(f"[S3] {len(uploads)} uploads em {time.time() - t0:.2f}s")
+
+def presign_put(bucket: str, key: str, content_type: str) -> dict:
+    """URL pré-assinada para o navegador fazer PUT direto no S3."""
+    url = s3.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": bucket, "Key": key, "ContentType": content_type},
+        ExpiresIn=settings.PRESIGNED_URL_EXPIRES,
+    )
+    return {"method": "PUT", "url": url, "headers": {"Content-Type": content_type}}
+
+def presign_multipart(bucket: str, key: str, content_type: str, size: int) -> dict:
+    """Inicia um multipart upload e pré-assina uma URL por parte."""
+    part_size = settings.MULTIPART_PART_SIZE
+    resp = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)
+    upload_id = resp["UploadId"]
+    n_parts = max(1, -(-size // part_size))
+    parts = [{
+        "part_number": n,
+        "url": s3.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": bucket, "Key": key, "UploadId": upload_id, "PartNumber": n},
+            ExpiresIn=settings.PRESIGNED_URL_EXPIRES,
+        ),
+    } for n in range(1, n_parts + 1)]
+    print(f"[S3] multipart iniciado key={key} size={size} parts={n_parts}")
+    return {"method": "MULTIPART", "upload_id": upload_id, "part_size": part_size, "parts": parts}
+
+def complete_multipart(bucket: str, key: str, upload_id: str, parts: list) -> bool:
+    """
+    Conclui o multipart; False se o upload não existe mais (NoSuchUpload: outro
+    finalize já concluiu ou foi abortado; quem chama confere com head_object).
+    """
+    # parts = [{"PartNumber": n, "ETag": "..."}] vindos do navegador
+    parts = sorted(({"PartNumber": int(p["PartNumber"]), "ETag": p["ETag"]} for p in parts),
+                   key=lambda p: p["PartNumber"])
+    try:
+        s3.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                     MultipartUpload={"Parts": parts})
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "NoSuchUpload":
+            print(f"[S3] multipart já concluído/abortado key={key}")
+            return False
+        raise
+    print(f"[S3] multipart concluído key={key} parts={len(parts)}")
+    return True
+
+def s3_missing_keys(bucket: str, keys: list) -> list:
+    """head_object em paralelo; retorna as chaves que não existem no bucket."""
+    def _exists(key):
+        try:
+            s3.head_object(Bucket=bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+    return [k for k, ok in zip(keys, _upload_pool.map(_exists, keys)) if not ok]
+
+def queue_url_for(lane: str = None) -> str:
+    """URL da fila da lane (sem fila interactive configurada, tudo vai para SQS_QUEUE_URL)."""
+    if lane == "interactive" and settings.SQS_QUEUE_URL_INTERACTIVE:
+        return settings.SQS_QUEUE_URL_INTERACTIVE
+    return settings.SQS_QUEUE_URL
+
+def enqueue_item(message: dict, queue_url: str = None):
     body = json.dumps(message)
-    resp = sqs.send_message(QueueUrl=settings.SQS_QUEUE_URL, MessageBody=body)
+    resp = sqs.send_message(QueueUrl=queue_url or settings.SQS_QUEUE_URL, MessageBody=body)
     print(f"[SQS] send_message MessageId={resp.get('MessageId')} BodyLen={len(body)}")
     return resp.get("MessageId")
+
+def enqueue_items(messages: list, retries: int = 3, queue_url: str = None) -> list:
+    """
+    Enfileira com send_message_batch (10 por chamada). Entradas que falharem
+    parcialmente são reenviadas com backoff. Retorna os MessageIds na ordem.
+    """
+    ids = [None] * len(messages)
+    queue_url = queue_url or settings.SQS_QUEUE_URL
+    for start in range(0, len(messages), 10):
+        pending = {str(i): json.dumps(messages[i]) for i in range(start, min(start + 10, len(messages)))}
+        for attempt in range(retries + 1):
+            resp = sqs.send_message_batch(
+                QueueUrl=queue_url,
+                Entries=[{"Id": i, "MessageBody": body} for i, body in pending.items()],
+            )
+            for ok in resp.get("Successful", []):
+                ids[int(ok["Id"])] = ok["MessageId"]
+                pending.pop(ok["Id"], None)
+            print(f"[SQS] send_message_batch ok={len(resp.get('Successful', []))} "
+                  f"failed={len(resp.get('Failed', []))} attempt={attempt}")
+            if not pending:
+                break
+            # falhas do lado do remetente (SenderFault) não adianta repetir
+            for f in resp.get("Failed", []):
+                if f.get("SenderFault"):
+                    raise RuntimeError(f"SQS rejeitou mensagem {f['Id']}: {f.get('Code')} {f.get('Message')}")
+            time.sleep(0.2 * (2 ** attempt))
+        if pending:
+            raise RuntimeError(f"SQS: {len(pending)} mensagens não enfileiradas após {retries} tentativas")
+    return ids
@@ -0,0 +1,104 @@
+"""
+Exclusão de jobs fora do request.
+
+DELETE marca o job como DELETING (um UPDATE) e responde 202; a limpeza roda
+numa thread do processo (schedule) e, para o que sobrar de um processo que
+morreu no meio, no comando `python manage.py cleanup_jobs`:
+
+  1. S3: lista o prefixo jobs/<id>/ e apaga em lotes de 1000 com
+     delete_objects, CLEANUP_S3_CONCURRENCY lotes em paralelo;
+  2. banco: DELETE direto em lotes (sem o cascade linha a linha do ORM),
+     páginas antes dos documentos e itens antes do job.
+
+As mensagens do job que ainda estão no SQS não dá para tirar uma a uma: o
+worker vê o job DELETING (ou o item que não existe mais) e confirma sem
+processar.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, router
+from .models import Job, JobItem
+from .aws_clients import s3, log_ddb
+
+_s3_pool = ThreadPoolExecutor(max_workers=settings.CLEANUP_S3_CONCURRENCY, thread_name_prefix="s3-delete")
+_runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-cleanup")
+_scheduled = set()
+_lock = threading.Lock()
+
+
+def mark_deleting(job_ids: list) -> list:
+    """Marca DELETING num UPDATE; retorna os ids que existiam."""
+    found = [str(i) for i in Job.objects.filter(id__in=job_ids).values_list("id", flat=True)]
+    if found:
+        Job.objects.filter(id__in=found).update(status="DELETING")
+    return found
+
+
+def schedule(job_ids: list):
+    """Limpeza em segundo plano (uma thread por processo; ids já agendados são ignorados)."""
+    with _lock:
+        job_ids = [j for j in map(str, job_ids) if j not in _scheduled]
+        _scheduled.update(job_ids)
+    if job_ids:
+        _runner.submit(_run, job_ids)
+
+
+def _run(job_ids: list):
+    try:
+        for job_id in job_ids:
+            try:
+                purge_job(job_id)
+            except Exception as e:
+                # fica DELETING: o comando cleanup_jobs tenta de novo
+                print(f"[CLEANUP] job={job_id} falhou: {type(e).__name__}: {e}")
+            finally:
+                with _lock:
+                    _scheduled.discard(job_id)
+    finally:
+        connection.close()  # conexão aberta por esta thread
+
+
+def purge_job(job_id: str) -> dict:
+    s3_deleted = delete_s3_prefix(settings.S3_BUCKET, f"jobs/{job_id}/")
+    rows = delete_rows(job_id)
+    log_ddb(actor="backend", action="DELETE_JOB_DONE", pk=str(job_id), payload={
+        "n_items": rows, "s3_deleted": s3_deleted})
+    print(f"[CLEANUP] job={job_id} rows={rows} s3={s3_deleted}")
+    return {"rows": rows, "s3_deleted": s3_deleted}
+
+
+def delete_s3_prefix(bucket: str, prefix: str) -> int:
+    """Apaga todos os objetos do prefixo: uma página do list = um delete_objects, em paralelo."""
+    futures = []
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        keys = [{"Key": o["Key"]} for o in page.get("Contents", [])]
+        if keys:  # list_objects_v2 devolve até 1000, o limite do delete_objects
+            futures.append(_s3_pool.submit(_delete_batch, bucket, keys))
+    return sum(f.result() for f in futures)
+
+
+def _delete_batch(bucket: str, keys: list) -> int:
+    resp = s3.delete_objects(Bucket=bucket, Delete={"Objects": keys, "Quiet": True})
+    errors = resp.get("Errors", [])
+    if errors:
+        e = errors[0]
+        raise RuntimeError(f"delete_objects: {len(errors)} falhas ({e.get('Key')}: {e.get('Code')})")
+    return len(keys)
+
+
+def delete_rows(job_id: str, batch: int = None) -> int:
+    """DELETE em lotes sem carregar os objetos; páginas (FK parent) antes dos documentos."""
+    batch = batch or settings.CLEANUP_ROW_BATCH
+    db = router.db_for_write(JobItem)
+    total = 0
+    for qs in (JobItem.objects.filter(job_id=job_id, parent__isnull=False),
+               JobItem.objects.filter(job_id=job_id)):
+        while True:
+            ids = list(qs.values_list("id", flat=True)[:batch])
+            if not ids:
+                break
+            JobItem.objects.filter(id__in=ids)._raw_delete(db)
+            total += len(ids)
+    Job.objects.filter(id=job_id)._raw_delete(db)
+    return total
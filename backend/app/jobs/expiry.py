@@ -0,0 +1,108 @@
+"""
+Expiração de jobs que passaram do prazo de retenção do SQS.
+
+Depois de sqs_retention_deadline as mensagens do job já saíram da fila: o
+que ficou PENDING/PROCESSING não vai mais ser processado. A varredura marca
+esses jobs e os itens presos como EXPIRED; job sem item nenhum (upload nunca
+finalizado) também. Job sem item em aberto já terminou e os resultados
+ficam: com item em ERROR ele nunca chega a DONE (done_items só conta DONE)
+e vira ERROR; se todos terminaram DONE, vira DONE.
+
+  - seleciona até `batch` ids pelo índice (status, sqs_retention_deadline):
+    um range scan por status em aberto, sem ORDER BY. Todo job selecionado
+    sai da faixa (EXPIRED, ERROR ou DONE), então o custo de cada lote não
+    cresce com a tabela;
+  - UPDATEs por lote (itens pelo índice (job, status), depois os jobs),
+    todos condicionais: o que o worker concluiu no meio tempo fica como está;
+  - opcional: apaga os objetos do job no S3 (cleanup.delete_s3_prefix) e o
+    ocr_text dos itens que expiraram (os DONE ficam como estão).
+
+Roda pelo comando `python manage.py expire_jobs` (cron) ou pela thread do
+worker (EXPIRE_SWEEP_INTERVAL).
+"""
+import threading, time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .models import Job, JobItem
+from .aws_clients import log_ddb
+from . import cleanup
+
+OPEN_STATUSES = ("PENDING", "PROCESSING")
+
+
+def expire_batch(now, batch: int, purge_s3: bool = False, clear_text: bool = False) -> dict:
+    """Um lote: até `batch` jobs vencidos; retorna as contagens (selected < batch = acabou)."""
+    ids = list(Job.objects.filter(status__in=OPEN_STATUSES, sqs_retention_deadline__lt=now)
+               .order_by().values_list("id", flat=True)[:batch])
+    if not ids:
+        return {"selected": 0, "jobs": 0, "items": 0, "settled": 0, "s3_deleted": 0}
+    selected = len(ids)
+
+    items = JobItem.objects.filter(job_id__in=ids, status__in=OPEN_STATUSES).update(
+        status="EXPIRED", updated_at=timezone.now())
+    # só quem ficou com item expirado (ou não tem item): se o último terminou no meio tempo, fica
+    any_items = JobItem.objects.filter(job=OuterRef("pk"))
+    expired_items = JobItem.objects.filter(job=OuterRef("pk"), status="EXPIRED")
+    jobs = Job.objects.filter(id__in=ids, status__in=OPEN_STATUSES).filter(
+        Exists(expired_items) | ~Exists(any_items)).update(status="EXPIRED")
+    # o resto já terminou: item de nível superior em ERROR -> ERROR; senão todos DONE -> DONE
+    failed_items = JobItem.objects.filter(job=OuterRef("pk"), parent__isnull=True, status="ERROR")
+    settled = Job.objects.filter(id__in=ids, status__in=OPEN_STATUSES).filter(
+        Exists(failed_items)).update(status="ERROR")
+    settled += Job.objects.filter(id__in=ids, status__in=OPEN_STATUSES).update(status="DONE")
+
+    if jobs < selected:  # algum terminou no meio tempo: só limpa os que expiraram
+        ids = list(Job.objects.filter(id__in=ids, status="EXPIRED").values_list("id", flat=True))
+    s3_deleted = 0
+    for job_id in ids:
+        if purge_s3:
+            s3_deleted += cleanup.delete_s3_prefix(settings.S3_BUCKET, f"jobs/{job_id}/")
+        log_ddb(actor="backend", action="EXPIRE_JOB", pk=str(job_id), payload={"purge_s3": purge_s3})
+    if clear_text:
+        JobItem.objects.filter(job_id__in=ids, status="EXPIRED").exclude(ocr_text=None).update(
+            ocr_text=None, updated_at=timezone.now())
+    return {"selected": selected, "jobs": jobs, "items": items, "settled": settled, "s3_deleted": s3_deleted}
+
+
+def sweep(batch: int = None, max_batches: int = None, grace: int = None,
+          purge_s3: bool = None, clear_text: bool = None) -> dict:
+    """Expira em lotes até não sobrar vencido ou até max_batches lotes nesta rodada."""
+    batch = batch or settings.EXPIRE_BATCH
+    max_batches = max_batches or settings.EXPIRE_MAX_BATCHES
+    grace = settings.EXPIRE_GRACE_SECONDS if grace is None else grace
+    purge_s3 = settings.EXPIRE_PURGE_S3 if purge_s3 is None else purge_s3
+    clear_text = settings.EXPIRE_CLEAR_TEXT if clear_text is None else clear_text
+
+    # folga: item que o worker ainda está terminando perto do prazo não vira EXPIRED
+    now = timezone.now() - timedelta(seconds=grace)
+    total = {"jobs": 0, "items": 0, "settled": 0, "s3_deleted": 0, "batches": 0}
+    for _ in range(max_batches):
+        r = expire_batch(now, batch, purge_s3, clear_text)
+        if r["selected"]:
+            total["batches"] += 1
+            for k in ("jobs", "items", "settled", "s3_deleted"):
+                total[k] += r[k]
+        if r["selected"] < batch:
+            break
+    if total["jobs"] or total["settled"]:
+        print(f"[EXPIRE] jobs={total['jobs']} items={total['items']} encerrados={total['settled']} "
+              f"s3={total['s3_deleted']} lotes={total['batches']}")
+    return total
+
+
+def start_sweeper(interval: float):
+    """Thread que roda sweep() a cada `interval` s (vários workers podem rodar: os UPDATEs são idempotentes)."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                sweep()
+            except Exception as e:
+                print(f"[EXPIRE] falhou: {type(e).__name__}: {e}")
+            finally:
+                connection.close()  # conexão desta thread; a próxima rodada abre outra
+
+    threading.Thread(target=loop, name="expire-sweeper", daemon=True).start()
@@ -0,0 +1,105 @@
+"""
+Exportação dos resultados de um job em streaming (NDJSON, CSV ou ZIP).
+
+Os itens saem do banco por iterator(chunk_size=EXPORT_CHUNK_SIZE) (cursor
+do lado do servidor no Postgres) em ordem de id pelo índice (job, id), e
+cada lote vira um pedaço da resposta: a memória não cresce com o job e o
+primeiro byte sai depois do primeiro lote.
+
+Retomada: os itens vêm ordenados por id; `after=<id do último recebido>`
+continua de onde a conexão caiu e `limit` corta em faixas.
+Páginas de documentos ficam de fora (o texto delas está no item pai).
+"""
+import csv, json, zipfile
+from django.conf import settings
+from .models import JobItem
+
+FIELDS = ["id", "s3_key", "status", "ocr_text", "error_msg", "pages_total", "created_at", "updated_at"]
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "zip": "application/zip",
+}
+
+
+def rows(job_id, after=None, limit=None):
+    """Dicts dos itens de nível superior em ordem de id, a partir de `after` (exclusive)."""
+    qs = JobItem.objects.filter(job_id=job_id, parent__isnull=True).order_by("id")
+    if after:
+        qs = qs.filter(id__gt=after)
+    if limit:
+        qs = qs[:limit]
+    for r in qs.values(*FIELDS).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        r["id"] = str(r["id"])
+        for k in ("created_at", "updated_at"):
+            r[k] = r[k].isoformat() if r[k] else None
+        yield r
+
+
+def _batched(it, n):
+    batch = []
+    for r in it:
+        batch.append(r)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson(it):
+    for batch in _batched(it, settings.EXPORT_CHUNK_SIZE):
+        yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch).encode()
+
+
+class _Echo:
+    """'Arquivo' do csv.writer que devolve a linha em vez de guardar."""
+    def write(self, value):
+        return value
+
+
+def csv_rows(it):
+    w = csv.writer(_Echo())
+    yield ("﻿" + w.writerow(FIELDS)).encode()  # BOM: acentos certos no Excel
+    for batch in _batched(it, settings.EXPORT_CHUNK_SIZE):
+        yield "".join(w.writerow([r[f] for f in FIELDS]) for r in batch).encode()
+
+
+class _Sink:
+    """Saída do ZipFile sem seek: acumula o que foi escrito até o próximo yield."""
+    def __init__(self):
+        self.parts = []
+
+    def write(self, b):
+        self.parts.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out, self.parts = b"".join(self.parts), []
+        return out
+
+
+def zip_texts(it):
+    """
+    <id>.txt com o texto de cada item pronto e <id>.error.txt com o erro dos
+    que falharam. O diretório central do ZIP só sai no fim, então o ZipFile
+    guarda ~0.5 KB por arquivo: a view limita a EXPORT_ZIP_MAX_ITEMS itens
+    por resposta (o resto vem com `after`); _cursor.txt traz o id do último
+    item lido, com ou sem arquivo.
+    """
+    sink = _Sink()
+    last = None
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for batch in _batched(it, settings.EXPORT_CHUNK_SIZE):
+            for r in batch:
+                last = r["id"]
+                if r["ocr_text"] is not None:
+                    zf.writestr(f"{r['id']}.txt", r["ocr_text"])
+                elif r["error_msg"]:
+                    zf.writestr(f"{r['id']}.error.txt", r["error_msg"])
+            yield sink.drain()
+        zf.writestr("_cursor.txt", last or "")
+    yield sink.drain()  # diretório central
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from app.jobs import cleanup
+from app.jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = "Conclui a exclusão dos jobs marcados DELETING (S3 + linhas), p.ex. depois de um restart."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="no máximo N jobs nesta rodada")
+
+    def handle(self, *args, **opts):
+        ids = Job.objects.filter(status="DELETING").order_by("created_at").values_list("id", flat=True)
+        if opts["limit"]:
+            ids = ids[:opts["limit"]]
+        n = rows = objs = 0
+        for job_id in list(ids):
+            r = cleanup.purge_job(str(job_id))
+            n, rows, objs = n + 1, rows + r["rows"], objs + r["s3_deleted"]
+        self.stdout.write(f"jobs={n} linhas={rows} objetos_s3={objs}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from app.jobs import expiry
+
+
+class Command(BaseCommand):
+    help = "Marca EXPIRED os jobs (e itens presos) que passaram de sqs_retention_deadline, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=None, help="jobs por lote (padrão EXPIRE_BATCH)")
+        parser.add_argument("--max-batches", type=int, default=None,
+                            help="no máximo N lotes nesta rodada (padrão EXPIRE_MAX_BATCHES)")
+        parser.add_argument("--grace", type=int, default=None,
+                            help="segundos de folga depois do prazo (padrão EXPIRE_GRACE_SECONDS)")
+        parser.add_argument("--purge-s3", action="store_true", default=None,
+                            help="apaga os objetos jobs/<id>/ no S3 dos jobs expirados")
+        parser.add_argument("--clear-text", action="store_true", default=None,
+                            help="apaga o ocr_text dos itens dos jobs expirados")
+
+    def handle(self, *args, **opts):
+        r = expiry.sweep(batch=opts["batch"], max_batches=opts["max_batches"], grace=opts["grace"],
+                         purge_s3=opts["purge_s3"], clear_text=opts["clear_text"])
+        self.stdout.write(f"jobs={r['jobs']} itens={r['items']} encerrados={r['settled']} "
+                          f"objetos_s3={r['s3_deleted']} lotes={r['batches']}")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from app.jobs import ocr_cache
+
+
+class Command(BaseCommand):
+    help = "Remove entradas do cache de OCR vencidas (TTL) ou excedentes (LRU)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ttl-days", type=int, default=None)
+        parser.add_argument("--max-entries", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        n = ocr_cache.prune(opts["ttl_days"], opts["max_entries"])
+        self.stdout.write(f"removidas={n}")
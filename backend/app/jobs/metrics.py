@@ -0,0 +1,141 @@
+"""
+Métricas Prometheus do web (Django) e do worker.
+
+    with span("s3_upload"):            # histograma ocr_stage_seconds{component,stage}
+        ...
+
+Web: GET /metrics. Worker: porta WORKER_METRICS_PORT. Com vários processos
+(gunicorn com N workers, worker com WORKER_PROCESSES > 1) defina
+PROMETHEUS_MULTIPROC_DIR (diretório vazio, gravável) ANTES de subir: cada
+processo grava ali e o endpoint soma todos. No deploy: o unit do web cria
+/run/ocr-backend-metrics vazio a cada start e o hook child_exit de
+backend/gunicorn.conf.py marca os workers mortos; o worker usa um mkdtemp.
+
+Sem prometheus_client instalado os spans viram no-op.
+"""
+import os, time, threading
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest,
+        start_http_server, REGISTRY,
+    )
+    from prometheus_client import multiprocess
+except ImportError:  # métricas são opcionais
+    Histogram = None
+
+MULTIPROC = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+COMPONENT = os.getenv("METRICS_COMPONENT", "web")
+
+# etapas vão de ~1ms (UPDATE) a minutos (OCR de scan grande)
+_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+if Histogram is not None:
+    STAGE_SECONDS = Histogram("ocr_stage_seconds", "Duração de cada etapa", ["component", "stage"],
+                              buckets=_BUCKETS)
+    STAGE_ERRORS = Counter("ocr_stage_errors_total", "Etapas que terminaram em exceção",
+                           ["component", "stage"])
+    ITEMS = Counter("ocr_items_total", "Itens finalizados pelo worker", ["status"])
+    QUEUE_TO_DONE = Histogram("ocr_queue_to_done_seconds", "Envio no SQS até o ack do item",
+                              ["lane"], buckets=_BUCKETS)
+    # gauges: cada processo informa o seu; no modo multiprocess vale o do processo vivo
+    QUEUE_DEPTH = Gauge("ocr_queue_depth", "Mensagens na fila (ApproximateNumberOf...)",
+                        ["lane", "state"], multiprocess_mode="livemax")
+    INFLIGHT = Gauge("ocr_worker_inflight", "Mensagens recebidas e ainda não finalizadas",
+                     multiprocess_mode="livesum")
+    TAIL_LATENCY = Gauge("ocr_queue_to_done_recent_seconds",
+                         "Latência fila->DONE nas últimas mensagens", ["quantile"],
+                         multiprocess_mode="livemax")
+
+
+@contextmanager
+def span(stage: str, component: str = None):
+    """Mede o bloco no histograma da etapa (e conta exceções)."""
+    if Histogram is None:
+        yield
+        return
+    component = component or COMPONENT
+    t = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(component, stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(component, stage).observe(time.perf_counter() - t)
+
+
+def count_item(status: str, n: int = 1):
+    if Histogram is not None:
+        ITEMS.labels(status).inc(n)
+
+
+_recent = deque(maxlen=int(os.getenv("METRICS_TAIL_WINDOW", "500")))
+_recent_lock = threading.Lock()
+
+
+def observe_queue_to_done(seconds: float, lane: str = "bulk"):
+    """Histograma por lane + p50/p99 das últimas METRICS_TAIL_WINDOW mensagens."""
+    if Histogram is None:
+        return
+    QUEUE_TO_DONE.labels(lane).observe(seconds)
+    with _recent_lock:
+        _recent.append(seconds)
+        v = sorted(_recent)
+    for q in (0.5, 0.9, 0.99):
+        TAIL_LATENCY.labels(str(q)).set(v[min(len(v) - 1, int(len(v) * q))])
+
+
+def watch_queue(sqs, queue_url: str, inflight=None, interval: float = 15.0, lane: str = "bulk"):
+    """Thread que atualiza profundidade da fila (uma por lane) e itens em voo."""
+    if Histogram is None:
+        return
+
+    def loop():
+        while True:
+            try:
+                attrs = sqs.get_queue_attributes(
+                    QueueUrl=queue_url,
+                    AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+                )["Attributes"]
+                QUEUE_DEPTH.labels(lane, "visible").set(int(attrs.get("ApproximateNumberOfMessages", 0)))
+                QUEUE_DEPTH.labels(lane, "in_flight").set(
+                    int(attrs.get("ApproximateNumberOfMessagesNotVisible", 0)))
+                if inflight:
+                    INFLIGHT.set(inflight())
+            except Exception as e:
+                print(f"[METRICS] get_queue_attributes falhou: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name=f"metrics-queue-{lane}", daemon=True).start()
+
+
+def _registry():
+    if MULTIPROC:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render():
+    """(corpo, content-type) no formato de exposição do Prometheus."""
+    if Histogram is None:
+        return b"# prometheus_client nao instalado\n", "text/plain"
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_server(port: int):
+    """Endpoint HTTP /metrics do worker (thread daemon)."""
+    if Histogram is None or not port:
+        return
+    start_http_server(port, registry=_registry())
+    print(f"[METRICS] http://0.0.0.0:{port}/metrics multiprocess={MULTIPROC}")
+
+
+def metrics_view(request):
+    from django.http import HttpResponse
+    body, content_type = render()
+    return HttpResponse(body, content_type=content_type)
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-17 20:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    # jobs existentes: preenche os contadores a partir dos itens (uma vez)
+    Job = apps.get_model("jobs", "Job")
+    JobItem = apps.get_model("jobs", "JobItem")
+    counts = (JobItem.objects.filter(job=OuterRef("pk")).order_by()
+              .values("job").annotate(n=Count("id")).values("n"))
+    done = (JobItem.objects.filter(job=OuterRef("pk"), status="DONE").order_by()
+            .values("job").annotate(n=Count("id")).values("n"))
+    Job.objects.update(total_items=Coalesce(Subquery(counts), 0),
+                       done_items=Coalesce(Subquery(done), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_ocrcache_jobitem_content_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='done_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-17 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_job_item_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['created_at', 'id'], name='job_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobitem',
+            index=models.Index(fields=['job', 'status'], name='jobitem_job_status_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-17 20:52
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # itens antigos: sem histórico de alteração, usa a criação
+    JobItem = apps.get_model("jobs", "JobItem")
+    JobItem.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='jobitem',
+            index=models.Index(fields=['job', 'updated_at'], name='jobitem_job_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-17 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_jobitem_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='ocr_engine',
+            field=models.CharField(default='easyocr', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='ocr_language',
+            field=models.CharField(default='en', max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-17 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_jobitem_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lane',
+            field=models.CharField(default='bulk', max_length=16),
+        ),
+    ]
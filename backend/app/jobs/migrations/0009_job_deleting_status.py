@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-17 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_job_lane'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'PENDING'), ('PROCESSING', 'PROCESSING'), ('DONE', 'DONE'), ('ERROR', 'ERROR'), ('EXPIRED', 'EXPIRED'), ('DELETING', 'DELETING')], default='PENDING', max_length=16),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-17 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_job_deleting_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobitem',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'PENDING'), ('PROCESSING', 'PROCESSING'), ('DONE', 'DONE'), ('ERROR', 'ERROR'), ('EXPIRED', 'EXPIRED')], default='PENDING', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'sqs_retention_deadline'], name='job_status_deadline_idx'),
+        ),
+    ]
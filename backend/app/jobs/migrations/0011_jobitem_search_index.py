@@ -0,0 +1,70 @@
+"""
+Índice de busca do ocr_text (ver app/jobs/search.py).
+
+Postgres: GIN de expressão parcial sobre to_tsvector(ocr_text), criado
+CONCURRENTLY (sem reescrever a tabela nem travar escritas, por isso a
+migração não é atômica); a busca usa a mesma expressão e o mesmo WHERE.
+SQLite: FTS5 com o conteúdo em jobs_jobitem, mantido por triggers.
+Só folhas (pages_total = 0) com texto entram no índice.
+"""
+from django.db import migrations
+
+PG_FORWARD = [
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS jobitem_ocr_tsv_idx ON jobs_jobitem
+        USING gin (to_tsvector('simple'::regconfig, ocr_text)) WHERE pages_total = 0""",
+]
+PG_BACKWARD = [
+    "DROP INDEX CONCURRENTLY IF EXISTS jobitem_ocr_tsv_idx",
+]
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS jobs_jobitem_fts USING fts5(
+        ocr_text, content='jobs_jobitem', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS jobs_jobitem_fts_ai AFTER INSERT ON jobs_jobitem
+        WHEN new.ocr_text IS NOT NULL AND new.pages_total = 0 BEGIN
+        INSERT INTO jobs_jobitem_fts(rowid, ocr_text) VALUES (new.rowid, new.ocr_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS jobs_jobitem_fts_ad AFTER DELETE ON jobs_jobitem
+        WHEN old.ocr_text IS NOT NULL AND old.pages_total = 0 BEGIN
+        INSERT INTO jobs_jobitem_fts(jobs_jobitem_fts, rowid, ocr_text) VALUES ('delete', old.rowid, old.ocr_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS jobs_jobitem_fts_au AFTER UPDATE OF ocr_text, pages_total ON jobs_jobitem
+        WHEN old.ocr_text IS NOT new.ocr_text OR old.pages_total IS NOT new.pages_total BEGIN
+        INSERT INTO jobs_jobitem_fts(jobs_jobitem_fts, rowid, ocr_text)
+            SELECT 'delete', old.rowid, old.ocr_text WHERE old.ocr_text IS NOT NULL AND old.pages_total = 0;
+        INSERT INTO jobs_jobitem_fts(rowid, ocr_text)
+            SELECT new.rowid, new.ocr_text WHERE new.ocr_text IS NOT NULL AND new.pages_total = 0;
+    END""",
+    # itens que já tinham texto
+    """INSERT INTO jobs_jobitem_fts(rowid, ocr_text)
+        SELECT rowid, ocr_text FROM jobs_jobitem WHERE ocr_text IS NOT NULL AND pages_total = 0""",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS jobs_jobitem_fts_ai",
+    "DROP TRIGGER IF EXISTS jobs_jobitem_fts_ad",
+    "DROP TRIGGER IF EXISTS jobs_jobitem_fts_au",
+    "DROP TABLE IF EXISTS jobs_jobitem_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    atomic = False  # CREATE INDEX CONCURRENTLY não roda dentro de transação
+
+    dependencies = [
+        ('jobs', '0010_job_expiry'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": PG_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": PG_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
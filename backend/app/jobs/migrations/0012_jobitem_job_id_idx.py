@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-17 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0011_jobitem_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobitem',
+            index=models.Index(fields=['job', 'id'], name='jobitem_job_id_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 
 class Job(models.Model):
     STATUS_CHOICES = [
@@ -8,12 +9,29 @@ class Job(models.Model):
         ("DONE", "DONE"),
         ("ERROR", "ERROR"),
         ("EXPIRED", "EXPIRED"),
+        ("DELETING", "DELETING"),  # excluído; S3 e linhas saem em segundo plano (cleanup.py)
     ]
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=160)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="PENDING")
     created_at = models.DateTimeField(auto_now_add=True)
     sqs_retention_deadline = models.DateTimeField(null=True, blank=True)
+    # contadores incrementais (F()); o worker fecha o job no mesmo UPDATE
+    total_items = models.PositiveIntegerField(default=0)
+    done_items = models.PositiveIntegerField(default=0)
+    # motor/idioma pedidos pelo job; vão em cada mensagem do SQS
+    ocr_engine = models.CharField(max_length=32, default="easyocr")
+    ocr_language = models.CharField(max_length=32, default="en")
+    # fila do SQS ("interactive" / "bulk"); ver settings.SQS_LANES
+    lane = models.CharField(max_length=16, default="bulk")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="job_created_idx"),
+            models.Index(fields=["status", "created_at"], name="job_status_created_idx"),
+            # varredura de expiração: (status em aberto, prazo vencido) é um range scan
+            models.Index(fields=["status", "sqs_retention_deadline"], name="job_status_deadline_idx"),
+        ]
 
     def __str__(self):
         return f"{self.id} - {self.name} [{self.status}]"
@@ -24,6 +42,7 @@ class JobItem(models.Model):
         ("PROCESSING", "PROCESSING"),
         ("DONE", "DONE"),
         ("ERROR", "ERROR"),
+        ("EXPIRED", "EXPIRED"),  # job passou do prazo sem processar este item (expiry.py)
     ]
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     job = models.ForeignKey(Job, related_name="items", on_delete=models.CASCADE)
@@ -32,8 +51,32 @@ class JobItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     ocr_text = models.TextField(blank=True, null=True)
     error_msg = models.TextField(null=True, blank=True)
+    content_sha256 = models.CharField(max_length=64, null=True, blank=True)
+    # auto_now não vale para .update(): quem atualiza em massa passa updated_at=timezone.now()
+    updated_at = models.DateTimeField(auto_now=True)
+    # documentos (PDF/TIFF) viram uma página por item filho; o pai junta o texto no fim
+    parent = models.ForeignKey("self", related_name="pages", null=True, blank=True, on_delete=models.CASCADE)
+    page_number = models.PositiveIntegerField(null=True, blank=True)
+    pages_total = models.PositiveIntegerField(default=0)
+    pages_done = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["job", "status"], name="jobitem_job_status_idx"),
+            models.Index(fields=["job", "id"], name="jobitem_job_id_idx"),  # exportação por faixa de id
+            models.Index(fields=["job", "updated_at"], name="jobitem_job_updated_idx"),
+        ]
 
     def __str__(self):
         return f"item:{self.id} job:{self.job_id} {self.status}"
-    
-    
+
+class OcrCache(models.Model):
+    """Resultado de OCR por conteúdo (sha256 dos bytes), reaproveitado entre jobs."""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    ocr_text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(default=timezone.now, db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"cache:{self.sha256[:12]} hits={self.hits}"
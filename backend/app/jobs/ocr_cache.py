@@ -0,0 +1,117 @@
+"""
+Cache de OCR endereçado por conteúdo (sha256 dos bytes da imagem).
+Motor/idioma fora do padrão entram na chave (cache_key): o mesmo arquivo
+lido em outro idioma é outra entrada.
+
+Fonte principal: tabela OcrCache (RDS). Cópia durável no S3 em
+cache/ocr/<sha256>.txt, usada pelo worker quando a linha já foi despejada
+do banco. Entradas sem hit há mais de OCR_CACHE_TTL_DAYS dias são ignoradas
+e removidas por `manage.py prune_ocr_cache`.
+"""
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from botocore.exceptions import ClientError
+from .models import OcrCache
+from .aws_clients import s3
+
+# contadores do processo (web ou worker)
+STATS = {"hit": 0, "miss": 0}
+
+
+def cache_key(sha: str, engine: str = None, lang: str = None) -> str:
+    """sha256 do conteúdo no padrão (compatível com as entradas antigas); senão deriva outro hash."""
+    engine = engine or settings.OCR_DEFAULT_ENGINE
+    lang = lang or settings.OCR_DEFAULT_LANGUAGE
+    if (engine, lang) == (settings.OCR_DEFAULT_ENGINE, settings.OCR_DEFAULT_LANGUAGE):
+        return sha
+    return hashlib.sha256(f"{sha}|{engine}|{lang}".encode()).hexdigest()
+
+
+def _s3_key(sha: str) -> str:
+    return f"cache/ocr/{sha}.txt"
+
+
+def _cutoff():
+    return timezone.now() - timedelta(days=settings.OCR_CACHE_TTL_DAYS)
+
+
+def _count(hits: int, misses: int):
+    STATS["hit"] += hits
+    STATS["miss"] += misses
+    print(f"[CACHE] hit={hits} miss={misses} total_hit={STATS['hit']} total_miss={STATS['miss']}")
+
+
+def _lookup_db(hashes) -> dict:
+    found = dict(OcrCache.objects.filter(sha256__in=hashes, last_hit_at__gte=_cutoff())
+                 .values_list("sha256", "ocr_text"))
+    if found:
+        OcrCache.objects.filter(sha256__in=list(found)).update(
+            hits=F("hits") + 1, last_hit_at=timezone.now())
+    return found
+
+
+def lookup_many(hashes, engine: str = None, lang: str = None) -> dict:
+    """sha256 -> ocr_text para os hashes que estão no cache (só banco, até 2 queries)."""
+    keys = {cache_key(h, engine, lang): h for h in set(hashes)}
+    if not keys:
+        return {}
+    found = _lookup_db(list(keys))
+    _count(len(found), len(keys) - len(found))
+    return {keys[k]: text for k, text in found.items()}
+
+
+def lookup(sha: str, engine: str = None, lang: str = None, use_s3: bool = True):
+    """Texto em cache para um hash (banco e, se não achar, S3) ou None."""
+    key = cache_key(sha, engine, lang)
+    text = _lookup_db([key]).get(key)
+    if text is None and use_s3:
+        text = _lookup_s3(key)
+    _count(int(text is not None), int(text is None))
+    return text
+
+
+def _lookup_s3(sha: str):
+    try:
+        obj = s3.get_object(Bucket=settings.S3_BUCKET, Key=_s3_key(sha))
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+    text = obj["Body"].read().decode("utf-8")
+    # volta para o banco (hit vindo do S3)
+    _upsert(sha, text, hits=1)
+    return text
+
+
+def _upsert(sha: str, text: str, hits: int = 0):
+    # INSERT ... ON CONFLICT DO UPDATE: um statement, sem SELECT antes
+    OcrCache.objects.bulk_create(
+        [OcrCache(sha256=sha, ocr_text=text, last_hit_at=timezone.now(), hits=hits)],
+        update_conflicts=True, unique_fields=["sha256"], update_fields=["ocr_text", "last_hit_at"])
+
+
+def store(sha: str, text: str, engine: str = None, lang: str = None):
+    key = cache_key(sha, engine, lang)
+    _upsert(key, text)
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=_s3_key(key),
+                  Body=text.encode("utf-8"), ContentType="text/plain; charset=utf-8")
+    print(f"[CACHE] store sha256={sha[:12]}... key={key[:12]}... len={len(text)}")
+
+
+def prune(ttl_days: int = None, max_entries: int = None) -> int:
+    """Remove entradas vencidas (TTL) e, acima de max_entries, as menos usadas (LRU)."""
+    ttl_days = settings.OCR_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+    max_entries = settings.OCR_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    cutoff = timezone.now() - timedelta(days=ttl_days)
+    n, _ = OcrCache.objects.filter(last_hit_at__lt=cutoff).delete()
+
+    extra = OcrCache.objects.count() - max_entries
+    if extra > 0:
+        old = list(OcrCache.objects.order_by("last_hit_at").values_list("sha256", flat=True)[:extra])
+        m, _ = OcrCache.objects.filter(sha256__in=old).delete()
+        n += m
+    print(f"[CACHE] prune removidas={n} ttl_days={ttl_days} max_entries={max_entries}")
+    return n
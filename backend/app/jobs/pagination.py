@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class JobCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) em created_at/id: cada página é um
+    WHERE created_at < ? ORDER BY ... LIMIT n, com custo constante por
+    mais que o histórico cresça (sem OFFSET nem COUNT(*)).
+    """
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 200
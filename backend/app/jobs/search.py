@@ -0,0 +1,110 @@
+"""
+Busca de texto nos resultados de OCR (índice invertido no banco).
+
+  - Postgres: índice GIN parcial na expressão to_tsvector('simple', ocr_text)
+    (config 'simple' por causa dos vários idiomas) só das folhas; a consulta
+    repete a mesma expressão e o mesmo WHERE para o planner usar o índice.
+    Ranking ts_rank_cd e trecho com ts_headline;
+  - SQLite (dev): tabela FTS5 jobs_jobitem_fts com o conteúdo em
+    jobs_jobitem (external content); ranking bm25 e trecho com snippet().
+
+Os dois se atualizam sozinhos a cada escrita de ocr_text (índice /
+triggers, ver a migração 0011), inclusive pelos .update()/bulk_update() do
+worker. Entram só as folhas: imagens e páginas; o documento que junta as
+páginas não é indexado de novo (a página traz page_number e parent_id).
+
+Consulta: palavras soltas (todas precisam aparecer) e "frases entre aspas".
+"""
+import re, uuid
+from django.db import connection
+
+TS_CONFIG = "simple"  # o mesmo do índice da migração 0011
+# idêntica à expressão indexada (inclusive o cast), senão o GIN não é usado
+_PG_TSV = f"to_tsvector('{TS_CONFIG}'::regconfig, i.ocr_text)"
+FTS_TABLE = "jobs_jobitem_fts"
+_START, _STOP = "[", "]"
+
+_PG_SQL = f"""
+WITH q AS (SELECT websearch_to_tsquery('{TS_CONFIG}', %s) AS q),
+hits AS (
+    SELECT i.id, i.job_id, i.parent_id, i.page_number, j.name AS job_name,
+           ts_rank_cd({_PG_TSV}, q.q) AS score
+    FROM jobs_jobitem i JOIN jobs_job j ON j.id = i.job_id, q
+    WHERE {_PG_TSV} @@ q.q AND i.pages_total = 0 AND j.status <> 'DELETING' {{job_filter}}
+    ORDER BY score DESC, i.id
+    LIMIT %s OFFSET %s
+)
+SELECT h.id, h.job_id, h.parent_id, h.page_number, h.job_name, h.score,
+       ts_headline('{TS_CONFIG}', i.ocr_text, q.q, %s) AS snippet
+FROM hits h JOIN jobs_jobitem i ON i.id = h.id, q
+ORDER BY h.score DESC, h.id
+"""
+
+_SQLITE_SQL = f"""
+SELECT i.id, i.job_id, i.parent_id, i.page_number, j.name, -bm25({FTS_TABLE}) AS score,
+       snippet({FTS_TABLE}, 0, '{_START}', '{_STOP}', '…', %s) AS snippet
+FROM {FTS_TABLE} f
+JOIN jobs_jobitem i ON i.rowid = f.rowid
+JOIN jobs_job j ON j.id = i.job_id
+WHERE {FTS_TABLE} MATCH %s AND j.status <> 'DELETING' {{job_filter}}
+ORDER BY bm25({FTS_TABLE}), i.id
+LIMIT %s OFFSET %s
+"""
+
+
+def fts5_query(q: str) -> str:
+    """Consulta do usuário -> sintaxe FTS5 sem operadores: termos e frases entre aspas (AND)."""
+    parts = []
+    for m in re.finditer(r'"([^"]*)"|(\S+)', q):
+        words = re.findall(r"\w+", m.group(1) if m.group(1) is not None else m.group(2))
+        if m.group(1) is not None and words:
+            parts.append('"' + " ".join(words) + '"')
+        else:
+            parts.extend(f'"{w}"' for w in words)
+    return " ".join(parts)
+
+
+def search(q: str, limit: int, offset: int = 0, job_id=None, snippet_words: int = 12) -> list:
+    """Itens cujo ocr_text casa com q, do mais relevante ao menos; [] se q não tiver termos."""
+    if connection.vendor == "postgresql":
+        sql, params = _PG_SQL, [q]
+        job_filter = ""
+        if job_id:
+            job_filter, params = "AND i.job_id = %s", params + [str(job_id)]
+        options = (f"StartSel={_START}, StopSel={_STOP}, MaxWords={snippet_words}, "
+                   f"MinWords={max(1, snippet_words // 3)}, MaxFragments=2")
+        params += [limit, offset, options]
+    else:
+        match = fts5_query(q)
+        if not match:
+            return []
+        sql, params = _SQLITE_SQL, [snippet_words, match]
+        job_filter = ""
+        if job_id:
+            # o Django guarda UUID no SQLite como 32 hex sem hífens
+            job_filter, params = "AND i.job_id = %s", params + [uuid.UUID(str(job_id)).hex]
+        params += [limit, offset]
+
+    with connection.cursor() as c:
+        c.execute(sql.format(job_filter=job_filter), params)
+        rows = c.fetchall()
+    return [{
+        "item_id": str(uuid.UUID(str(item_id))),
+        "job_id": str(uuid.UUID(str(jid))),
+        "job_name": job_name,
+        "parent_id": str(uuid.UUID(str(parent_id))) if parent_id else None,
+        "page_number": page_number,
+        "score": round(float(score), 6),
+        "snippet": snippet,
+    } for item_id, jid, parent_id, page_number, job_name, score, snippet in rows]
+
+
+def rebuild():
+    """Reconstrói o FTS5 do SQLite (p.ex. depois de um VACUUM, que renumera rowid). No Postgres não há o que fazer."""
+    if connection.vendor != "sqlite":
+        return 0
+    with connection.cursor() as c:
+        c.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        c.execute(f"INSERT INTO {FTS_TABLE}(rowid, ocr_text) SELECT rowid, ocr_text FROM jobs_jobitem "
+                  "WHERE ocr_text IS NOT NULL AND pages_total = 0")
+        return c.rowcount
@@ -4,9 +4,18 @@ from .models import Job, JobItem
 class JobItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobItem
-        fields = ["id", "s3_key", "status", "created_at", "ocr_text", "error_msg"]
+        fields = ["id", "s3_key", "status", "created_at", "updated_at", "ocr_text", "error_msg",
+                  "pages_total", "pages_done"]
 
-class JobSerializer(serializers.ModelSerializer):
+class FieldsMixin:
+    """Aceita fields=[...] para devolver só parte dos campos (?fields=id,name)."""
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class JobSerializer(FieldsMixin, serializers.ModelSerializer):
     total_items = serializers.IntegerField(read_only=True)
     done_items = serializers.IntegerField(read_only=True)
 
@@ -14,11 +23,15 @@ class JobSerializer(serializers.ModelSerializer):
         model = Job
         fields = [
             "id", "name", "status", "created_at", "sqs_retention_deadline",
-            "total_items", "done_items"
+            "total_items", "done_items", "ocr_engine", "ocr_language", "lane"
         ]
 
 class JobDetailSerializer(JobSerializer):
-    items = JobItemSerializer(many=True, read_only=True)
+    items = serializers.SerializerMethodField()
 
     class Meta(JobSerializer.Meta):
         fields = JobSerializer.Meta.fields + ["items"]
+
+    def get_items(self, job):
+        # páginas de documentos ficam de fora: o texto delas já está no item pai
+        return JobItemSerializer(job.items.filter(parent__isnull=True), many=True).data
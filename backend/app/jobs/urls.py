@@ -1,7 +1,15 @@
 from django.urls import path
-from .views import JobsView, JobDetailView
+from .views import (
+    JobsView, JobDetailView, JobUploadsView, JobFinalizeView, JobProgressView, JobsBulkDeleteView, JobExportView, SearchView,
+)
 
 urlpatterns = [
     path("jobs/", JobsView.as_view()),
+    path("jobs/uploads/", JobUploadsView.as_view()),
+    path("jobs/delete/", JobsBulkDeleteView.as_view()),
+    path("jobs/<uuid:job_id>/finalize/", JobFinalizeView.as_view()),
+    path("jobs/<uuid:job_id>/progress/", JobProgressView.as_view()),
+    path("jobs/<uuid:job_id>/export/", JobExportView.as_view()),
     path("jobs/<uuid:job_id>/", JobDetailView.as_view()),
+    path("search/", SearchView.as_view()),
 ]
@@ -1,5 +1,43 @@
+import hashlib
 from datetime import datetime, timedelta
 from django.conf import settings
+from django.utils import timezone
 
 def retention_deadline_from_now() -> datetime:
-    return datetime.utcnow() + timedelta(seconds=settings.SQS_RETENTION_SECONDS)
+    return timezone.now() + timedelta(seconds=settings.SQS_RETENTION_SECONDS)
+
+# assinaturas (magic bytes) -> extensão; substitui o imghdr (removido no Python 3.13)
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"BM", "bmp"),
+    (b"%PDF-", "pdf"),
+]
+
+def sniff_type(head: bytes):
+    """Extensão pelo cabeçalho do arquivo (primeiros bytes) ou None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for magic, ext in _SIGNATURES:
+        if head.startswith(magic):
+            return ext
+    return None
+
+def hash_and_sniff(f, chunk_size: int = 1024 * 1024):
+    """
+    Lê o upload em blocos (UploadedFile.chunks): sha256 e tipo sem carregar
+    o arquivo inteiro na memória. Volta o arquivo para o início.
+    Retorna (sha256_hex, extensão ou None).
+    """
+    h = hashlib.sha256()
+    head = b""
+    for chunk in f.chunks(chunk_size):
+        if len(head) < 16:
+            head += chunk[:16 - len(head)]
+        h.update(chunk)
+    f.seek(0)
+    return h.hexdigest(), sniff_type(head)
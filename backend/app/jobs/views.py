@@ -1,28 +1,135 @@
-import hashlib
-import io, uuid, imghdr
+import io, math, os, time, uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
 from typing import List
-from django.db.models import Count, Q
-from django.utils.timezone import make_aware
+from botocore.exceptions import ClientError
+from django.db import IntegrityError
+from django.db.models import F
+from django.http import StreamingHttpResponse
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from .models import Job, JobItem
-from .serializers import JobSerializer, JobDetailSerializer
-from .aws_clients import upload_s3_bytes, enqueue_item, log_ddb
-from .utils import retention_deadline_from_now
+from .serializers import JobSerializer, JobDetailSerializer, JobItemSerializer
+from .pagination import JobCursorPagination
+from .aws_clients import (
+    upload_s3_many, enqueue_items, queue_url_for, log_ddb,
+    presign_put, presign_multipart, complete_multipart, s3_missing_keys,
+)
+from .utils import retention_deadline_from_now, hash_and_sniff
+from . import ocr_cache, cleanup, search, export
+from .metrics import span
+
+def _ocr_options(data):
+    """(motor, idioma) pedidos no request; ValueError se inválidos."""
+    engine = data.get("ocr_engine") or settings.OCR_DEFAULT_ENGINE
+    lang = (data.get("ocr_language") or settings.OCR_DEFAULT_LANGUAGE).lower()
+    if engine not in settings.OCR_ENGINES:
+        raise ValueError(f"'ocr_engine' deve ser um de: {', '.join(settings.OCR_ENGINES)}.")
+    # códigos de OCR_LANGUAGES ("en", "pt", "ch_sim"), até 4 com "+"
+    codes = lang.split("+")
+    if len(codes) > 4 or len(set(codes)) < len(codes) or any(c not in settings.OCR_LANGUAGES for c in codes):
+        raise ValueError(f"'ocr_language' deve combinar com '+' até 4 de: {', '.join(settings.OCR_LANGUAGES)}.")
+    return engine, lang
+
+def _lane_for(data, n_files: int) -> str:
+    """Lane do job: 'lane' pedida no request ou, sem ela, pelo tamanho do job."""
+    lane = data.get("lane")
+    if lane:
+        if lane not in settings.SQS_LANES:
+            raise ValueError(f"'lane' deve ser um de: {', '.join(settings.SQS_LANES)}.")
+        return lane
+    return "interactive" if n_files <= settings.LANE_INTERACTIVE_MAX_ITEMS else "bulk"
+
+def _create_job(name: str, n_files: int, engine: str, lang: str, lane: str) -> Job:
+    job = Job.objects.create(name=name, status="PENDING", ocr_engine=engine, ocr_language=lang,
+                             lane=lane, sqs_retention_deadline=retention_deadline_from_now())
+    print(f"[CREATE_JOB] id={job.id} name={job.name} files={n_files} ocr={engine}:{lang} "
+          f"lane={lane} deadline={job.sqs_retention_deadline}")
+    return job
+
+def _cached_item(job: Job, sha: str, text: str) -> JobItem:
+    # hit no cache de OCR: o item já nasce DONE (sem objeto no S3)
+    print(f"[CACHE_HIT] job={job.id} sha256={sha[:12]}...")
+    return JobItem(job=job, s3_key="", status="DONE", ocr_text=text, content_sha256=sha)
+
+# documentos de várias páginas: o worker divide em páginas antes do OCR (worker/splitter.py)
+_SPLIT_EXTS = ("pdf", "tif", "tiff")
+
+def _stage_for(s3_key: str) -> str:
+    return "split" if s3_key.rsplit(".", 1)[-1].lower() in _SPLIT_EXTS else "ocr"
+
+def _save_and_enqueue(job: Job, items: List[JobItem]):
+    """Um único INSERT para os itens e as mensagens do SQS em lotes de 10."""
+    with span("db_insert"):
+        JobItem.objects.bulk_create(items)
+        Job.objects.filter(id=job.id).update(
+            total_items=F("total_items") + len(items),
+            done_items=F("done_items") + sum(1 for it in items if it.status == "DONE"),
+        )
+    pending = [it for it in items if it.status == "PENDING"]
+    msgs = [{
+        "job_id": str(job.id),
+        "item_id": str(it.id),
+        "s3_bucket": settings.S3_BUCKET,
+        "s3_key": it.s3_key,
+        "sha256": it.content_sha256,
+        "ocr_engine": job.ocr_engine,
+        "ocr_language": job.ocr_language,
+        "created_at": job.created_at.isoformat(),
+        "stage": _stage_for(it.s3_key),
+        "lane": job.lane,
+    } for it in pending]
+    with span("enqueue"):
+        mids = enqueue_items(msgs, queue_url=queue_url_for(job.lane))
+    for it, mid in zip(pending, mids):
+        print(f"[ENQUEUE] job={job.id} item={it.id} msgId={mid}")
+
+def _mark_done_from_cache(job: Job, n_items: int):
+    # todos os itens vieram do cache: o job já nasce DONE
+    job.status = "DONE"
+    job.save(update_fields=["status"])
+    print(f"[JOB_DONE] job={job.id} total={n_items} (cache)")
+
+def _ext_for(filename: str, content_type: str) -> str:
+    # extensão do S3 a partir do nome do arquivo (ou do content-type)
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if not ext and content_type and "/" in content_type:
+        ext = content_type.split("/", 1)[1]
+    ext = "jpg" if ext in ("", "jpeg", "jpg") else ext
+    return "".join(c for c in ext if c.isalnum())[:8] or "jpg"
 
 class JobsView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        qs = Job.objects.annotate(
-            total_items=Count("items"),
-            done_items=Count("items", filter=Q(items__status="DONE")),
-        ).order_by("-created_at")
-        data = JobSerializer(qs, many=True).data
-        print(f"[LIST] {len(data)} jobs")
-        return Response({"results": data})
+        """
+        Lista paginada por cursor. Query params:
+          ?status=PENDING,DONE   filtra por status
+          ?fields=id,name        devolve só esses campos
+          ?page_size=50          tamanho da página (máx. 200)
+          ?cursor=...            vem em "next"/"previous"
+        """
+        qs = Job.objects.all()
+        statuses = [s for s in request.query_params.get("status", "").upper().split(",") if s]
+        if statuses:
+            qs = qs.filter(status__in=statuses)
+        else:
+            qs = qs.exclude(status="DELETING")  # já excluídos, esperando a limpeza
+
+        fields = [f for f in request.query_params.get("fields", "").split(",") if f]
+        if fields:
+            unknown = set(fields) - set(JobSerializer.Meta.fields)
+            if unknown:
+                return Response({"detail": f"Campos inválidos: {', '.join(sorted(unknown))}."}, status=400)
+            # só as colunas pedidas (+ as da ordenação do cursor)
+            qs = qs.only(*(set(fields) | {"id", "created_at"}))
+
+        paginator = JobCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        data = JobSerializer(page, many=True, fields=fields or None).data
+        print(f"[LIST] {len(data)} jobs status={statuses or '*'}")
+        return paginator.get_paginated_response(data)
 
     def post(self, request):
         name = request.data.get("name") or "untitled"
@@ -30,66 +137,192 @@ class JobsView(APIView):
         if not files:
             return Response({"detail": "Envie ao menos uma imagem em 'images[]'."},
                             status=status.HTTP_400_BAD_REQUEST)
+        try:
+            engine, lang = _ocr_options(request.data)
+            lane = _lane_for(request.data, len(files))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        job = Job.objects.create(name=name, status="PENDING")
-        job.sqs_retention_deadline = make_aware(retention_deadline_from_now())
-        job.save(update_fields=["sqs_retention_deadline"])
-
-        print(f"[CREATE_JOB] id={job.id} name={job.name} files={len(files)} "
-              f"deadline={job.sqs_retention_deadline}")
+        job = _create_job(name, len(files), engine, lang, lane)
 
         created_items: List[JobItem] = []
+        uploads = []
         seen_hashes = set()  # <<< dedup deste POST por conteúdo
+        unique = []
 
         for f in files:
-            raw = f.read()
-
-            h = hashlib.sha256(raw).hexdigest()
+            # em blocos: arquivos grandes ficam em disco (FILE_UPLOAD_MAX_MEMORY_SIZE)
+            with span("hash"):
+                h, kind = hash_and_sniff(f)
             if h in seen_hashes:
                 print(f"[SKIP_DUP] mesmo conteúdo no mesmo POST: {f.name} sha256={h[:12]}...")
                 continue
             seen_hashes.add(h)
+            unique.append((f, kind, h))
+
+        # dedup entre jobs: conteúdo já processado sai DONE sem upload nem SQS
+        with span("cache_lookup"):
+            cached = ocr_cache.lookup_many(seen_hashes, engine, lang)
 
-            # tenta detectar tipo básico
-            guess = imghdr.what(None, h=raw) or "jpeg"
-            ext = "jpg" if guess in ("jpeg", "jpg") else guess
+        for f, kind, h in unique:
+            if h in cached:
+                created_items.append(_cached_item(job, h, cached[h]))
+                continue
+
+            ext = kind or "jpg"
             item_id = uuid.uuid4()
             s3_key = f"jobs/{job.id}/{item_id}.{ext}"
 
-            upload_s3_bytes(settings.S3_BUCKET, s3_key, raw, f.content_type or "image/jpeg")
-
-            it = JobItem.objects.create(job=job, s3_key=s3_key, status="PENDING")
-            created_items.append(it)
+            # o arquivo vai direto (upload_fileobj lê em blocos)
+            uploads.append((s3_key, f, f.content_type or "image/jpeg"))
+            created_items.append(JobItem(id=item_id, job=job, s3_key=s3_key, status="PENDING",
+                                         content_sha256=h))
 
-            msg = {
-                "job_id": str(job.id),
-                "item_id": str(it.id),
-                "s3_bucket": settings.S3_BUCKET,
-                "s3_key": s3_key,
-                "created_at": job.created_at.isoformat(),
-            }
-            mid = enqueue_item(msg)
-            print(f"[ENQUEUE] job={job.id} item={it.id} msgId={mid}")
+        # 1) S3 em paralelo  2) um único INSERT  3) SQS em lotes de 10
+        with span("s3_upload"):
+            upload_s3_many(settings.S3_BUCKET, uploads)
+        _save_and_enqueue(job, created_items)
+        if created_items and not uploads:
+            _mark_done_from_cache(job, len(created_items))
 
         log_ddb(actor="backend", action="CREATE_JOB", pk=str(job.id), payload={
             "name": name, "n_items": len(created_items)
         })
 
         # retorna com contagens
-        job.total_items = len(created_items)  # ad-hoc p/ serializer
-        job.done_items = 0
+        job.refresh_from_db(fields=["status", "total_items", "done_items"])
         data = JobDetailSerializer(job).data
         return Response(data, status=status.HTTP_201_CREATED)
 
+class JobUploadsView(APIView):
+    """
+    Fase 1 do upload direto: cria o job e devolve, por arquivo, uma URL
+    pré-assinada de PUT (ou as URLs das partes de um multipart upload).
+    O navegador sobe os bytes direto no S3; o Django não vê a imagem.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        name = request.data.get("name") or "untitled"
+        files = request.data.get("files") or []
+        if not files or not isinstance(files, list) or not all(isinstance(f, dict) for f in files):
+            return Response({"detail": "Informe 'files': [{name, content_type, size}]."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            engine, lang = _ocr_options(request.data)
+            lane = _lane_for(request.data, len(files))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            sizes = [int(f.get("size") or 0) for f in files]
+        except (TypeError, ValueError):
+            return Response({"detail": "'size' deve ser o tamanho do arquivo em bytes."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        job = _create_job(name, len(files), engine, lang, lane)
+        # sem cache aqui: um sha256 vindo do cliente não prova que ele tem o arquivo.
+        # O worker consulta o cache com o hash do objeto que baixou do S3.
+        uploads = []
+        for f, size in zip(files, sizes):
+            ct = f.get("content_type") or "image/jpeg"
+            item_id = uuid.uuid4()
+            s3_key = f"jobs/{job.id}/{item_id}.{_ext_for(f.get('name'), ct)}"
+            if size > settings.MULTIPART_THRESHOLD:
+                target = presign_multipart(settings.S3_BUCKET, s3_key, ct, size)
+            else:
+                target = presign_put(settings.S3_BUCKET, s3_key, ct)
+            uploads.append({"item_id": str(item_id), "name": f.get("name"), "s3_key": s3_key, **target})
+
+        print(f"[PRESIGN] job={job.id} uploads={len(uploads)}")
+        return Response({"job_id": str(job.id), "uploads": uploads}, status=status.HTTP_201_CREATED)
+
+class JobFinalizeView(APIView):
+    """
+    Fase 2: o navegador informa o que subiu; conclui os multipart uploads,
+    confere no S3, cria os JobItem (um INSERT) e enfileira no SQS.
+    Idempotente: itens já finalizados são ignorados e o multipart só é
+    concluído se o objeto ainda não existe (num retry ele já foi concluído).
+    Job que já saiu de PENDING/PROCESSING (exclusão, expiração, fim) não
+    recebe itens: 409.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, job_id):
+        try:
+            job = Job.objects.get(id=job_id)
+        except Job.DoesNotExist:
+            return Response({"detail": "Job não encontrado."}, status=404)
+
+        if job.status not in ("PENDING", "PROCESSING"):
+            return Response({"detail": f"Job em {job.status} não recebe itens."}, status=409)
+
+        entries = request.data.get("items") or []
+        if not entries or not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+            return Response({"detail": "Informe 'items': [{item_id, s3_key, upload_id?, parts?}]."}, status=400)
+
+        prefix = f"jobs/{job.id}/"
+        by_id = {}  # item_id repetido no mesmo request: vale uma vez
+        for e in entries:
+            try:
+                e["item_id"] = str(uuid.UUID(str(e.get("item_id"))))
+            except ValueError:
+                return Response({"detail": "item_id inválido."}, status=400)
+            if not isinstance(e.get("s3_key"), str) or not e["s3_key"].startswith(prefix):
+                return Response({"detail": f"s3_key deve começar com '{prefix}'."}, status=400)
+            by_id[e["item_id"]] = e
+        entries = list(by_id.values())
+
+        owners = dict(JobItem.objects.filter(id__in=list(by_id)).values_list("id", "job_id"))
+        if any(j != job.id for j in owners.values()):
+            return Response({"detail": "item_id já pertence a outro job."}, status=409)
+        existing = {str(i) for i in owners}
+        entries = [e for e in entries if e["item_id"] not in existing]
+
+        try:
+            missing = s3_missing_keys(settings.S3_BUCKET, [e["s3_key"] for e in entries])
+            pending = [e for e in entries if e.get("upload_id") and e["s3_key"] in missing]
+            for e in pending:
+                complete_multipart(settings.S3_BUCKET, e["s3_key"], e["upload_id"], e.get("parts") or [])
+            if pending:
+                missing = s3_missing_keys(settings.S3_BUCKET, missing)
+        except (KeyError, TypeError, ValueError):
+            return Response({"detail": "'parts' inválido: use [{PartNumber, ETag}]."}, status=400)
+        except ClientError as err:
+            code = err.response.get("Error", {}).get("Code", "")
+            print(f"[FINALIZE] job={job.id} S3 {code}: {err}")
+            if code in ("InvalidPart", "InvalidPartOrder", "EntityTooSmall", "MalformedXML"):
+                return Response({"detail": f"Multipart inválido ({code})."}, status=400)
+            return Response({"detail": f"Falha no S3 ({code})."}, status=502)
+        if missing:
+            return Response({"detail": "Objetos não encontrados no S3.", "missing": missing}, status=400)
+
+        # content_sha256 fica vazio: o hash do cliente não é conferido (o worker calcula o dele)
+        items = [JobItem(id=e["item_id"], job=job, s3_key=e["s3_key"], status="PENDING") for e in entries]
+        if items:
+            try:
+                _save_and_enqueue(job, items)
+            except IntegrityError:
+                # outro finalize dos mesmos itens ganhou a corrida (o INSERT é atômico): se
+                # todos já estão neste job, é o mesmo resultado de um retry
+                if JobItem.objects.filter(job=job, id__in=[it.id for it in items]).count() != len(items):
+                    return Response({"detail": "Itens em conflito com outra finalização."}, status=409)
+                print(f"[FINALIZE] job={job.id} itens já criados por outro finalize")
+                job.refresh_from_db()
+                return Response(JobSerializer(job).data, status=status.HTTP_201_CREATED)
+            log_ddb(actor="backend", action="CREATE_JOB", pk=str(job.id), payload={
+                "name": job.name, "n_items": len(items), "direct_upload": True
+            })
+        print(f"[FINALIZE] job={job.id} items={len(items)} skipped={len(existing)}")
+
+        job.refresh_from_db()
+        return Response(JobSerializer(job).data, status=status.HTTP_201_CREATED)
+
 class JobDetailView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, job_id):
         try:
-            job = Job.objects.annotate(
-                total_items=Count("items"),
-                done_items=Count("items", filter=Q(items__status="DONE")),
-            ).get(id=job_id)
+            job = Job.objects.get(id=job_id)
         except Job.DoesNotExist:
             return Response({"detail": "Job não encontrado."}, status=404)
 
@@ -117,51 +350,183 @@ class JobDetailView(APIView):
         return Response({"id": str(job.id), "name": job.name})
 
     def delete(self, request, job_id):
-        from django.conf import settings
-        import boto3
+        # só marca: S3 e linhas saem em segundo plano (cleanup.py); job grande não estoura o timeout
+        if not cleanup.mark_deleting([job_id]):
+            return Response({"detail": "Job não encontrado."}, status=404)
+        cleanup.schedule([job_id])
+        log_ddb(actor="backend", action="DELETE_JOB", pk=str(job_id), payload={"async": True})
+        print(f"[DELETE] {job_id} -> DELETING")
+        return Response({"id": str(job_id), "status": "DELETING"}, status=status.HTTP_202_ACCEPTED)
+
+
+class JobsBulkDeleteView(APIView):
+    """POST /api/jobs/delete/ json: {ids: [...]} -> marca todos DELETING num UPDATE e limpa em segundo plano."""
+    permission_classes = [permissions.AllowAny]
 
+    def post(self, request):
+        ids = request.data.get("ids") or []
+        if not isinstance(ids, list) or not ids:
+            return Response({"detail": "Informe 'ids': [...]."}, status=400)
+        if len(ids) > settings.BULK_DELETE_MAX_JOBS:
+            return Response({"detail": f"No máximo {settings.BULK_DELETE_MAX_JOBS} jobs por chamada."},
+                            status=400)
         try:
-            job = Job.objects.get(id=job_id)
-        except Job.DoesNotExist:
+            ids = [str(uuid.UUID(str(i))) for i in ids]
+        except ValueError:
+            return Response({"detail": "id inválido."}, status=400)
+
+        found = cleanup.mark_deleting(ids)
+        cleanup.schedule(found)
+        for job_id in found:
+            log_ddb(actor="backend", action="DELETE_JOB", pk=job_id, payload={"async": True, "bulk": True})
+        missing = sorted(set(ids) - set(found))
+        print(f"[BULK_DELETE] deleting={len(found)} not_found={len(missing)}")
+        return Response({"deleting": found, "not_found": missing}, status=status.HTTP_202_ACCEPTED)
+
+
+
+def _us_to_dt(us: int):
+    return datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(microseconds=us)
+
+def _dt_to_us(dt) -> int:
+    return (dt - datetime(1970, 1, 1, tzinfo=dt_timezone.utc)) // timedelta(microseconds=1)
+
+# cursor válido: de 1970 até bem antes do fim do datetime (o lag ainda é subtraído dele)
+_MAX_CURSOR_US = _dt_to_us(datetime(9000, 1, 1, tzinfo=dt_timezone.utc))
+
+
+class JobProgressView(APIView):
+    """
+    GET /api/jobs/<id>/progress/?since=<cursor>&wait=<s>
+
+    Contadores do job + só os itens alterados depois de `since` (cursor
+    opaco devolvido na resposta anterior; sem `since` vêm todos). Com
+    `wait`, segura a requisição (long-poll) até haver mudança ou o tempo
+    acabar, em vez de o cliente perguntar a cada poucos segundos.
+
+    updated_at vem do relógio de quem grava, não da ordem de commit: uma
+    transação que commita depois da leitura pode ter updated_at menor que o
+    cursor. Por isso a resposta repete os itens dos últimos
+    PROGRESS_CURSOR_LAG s antes de `since` (o cliente junta por id).
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, job_id):
+        since = request.query_params.get("since")
+        try:
+            since_us = int(since) if since else None
+            wait = min(float(request.query_params.get("wait", 0)), settings.PROGRESS_MAX_WAIT)
+            if not math.isfinite(wait) or (since_us is not None and not 0 <= since_us <= _MAX_CURSOR_US):
+                raise ValueError("fora do intervalo")
+        except ValueError:
+            return Response({"detail": "Parâmetros 'since'/'wait' inválidos."}, status=400)
+
+        job = Job.objects.filter(id=job_id).only("id", "status", "total_items", "done_items").first()
+        if job is None:
             return Response({"detail": "Job não encontrado."}, status=404)
 
-        # apaga objetos S3 com prefixo jobs/<job_id>/
-        session = boto3.session.Session(region_name=settings.AWS_REGION)
-        s3 = session.client("s3")
-        prefix = f"jobs/{job.id}/"
-        print(f"[S3-DELETE] prefix={prefix}")
-
-        # listar em páginas e deletar em lotes (até 1000 por chamada)
-        to_delete = []
-        token = None
-        total = 0
-        while True:
-            kw = dict(Bucket=settings.S3_BUCKET, Prefix=prefix)
-            if token:
-                kw["ContinuationToken"] = token
-            resp = s3.list_objects_v2(**kw)
-            contents = resp.get("Contents", [])
-            if not contents and not resp.get("IsTruncated"):
-                break
-            for obj in contents:
-                to_delete.append({"Key": obj["Key"]})
-                if len(to_delete) == 1000:
-                    s3.delete_objects(Bucket=settings.S3_BUCKET, Delete={"Objects": to_delete})
-                    total += len(to_delete)
-                    print(f"[S3-DELETE] batch {len(to_delete)}")
-                    to_delete = []
-            if resp.get("IsTruncated"):
-                token = resp.get("NextContinuationToken")
-            else:
-                break
-        if to_delete:
-            s3.delete_objects(Bucket=settings.S3_BUCKET, Delete={"Objects": to_delete})
-            total += len(to_delete)
-            print(f"[S3-DELETE] last batch {len(to_delete)}")
-
-        n_items = job.items.count()
-        job.delete()
-        log_ddb(actor="backend", action="DELETE_JOB", pk=str(job_id), payload={"n_items": n_items, "s3_deleted": total})
-        print(f"[DELETE] {job_id} rows={n_items+1} s3={total}")
-        return Response(status=204)
+        # páginas não aparecem: o progresso delas vai em pages_done do item pai
+        items = JobItem.objects.filter(job_id=job_id, parent__isnull=True)
+        if since_us is not None:
+            since_dt = _us_to_dt(since_us)
+            newer = items.filter(updated_at__gt=since_dt)
+            # long-poll: EXISTS no índice (job, updated_at) até aparecer mudança
+            deadline = time.monotonic() + wait
+            while (job.status not in ("DONE", "ERROR") and time.monotonic() < deadline
+                   and not newer.exists()):
+                time.sleep(settings.PROGRESS_POLL_INTERVAL)
+            job.refresh_from_db(fields=["status", "total_items", "done_items"])
+            items = items.filter(updated_at__gt=since_dt - timedelta(seconds=settings.PROGRESS_CURSOR_LAG))
+
+        changed = list(items.order_by("updated_at"))
+        cursor = max(_dt_to_us(changed[-1].updated_at), since_us or 0) if changed else since_us
+        print(f"[PROGRESS] {job_id} since={since_us} changed={len(changed)}")
+        return Response({
+            "id": str(job.id),
+            "status": job.status,
+            "total_items": job.total_items,
+            "done_items": job.done_items,
+            "items": JobItemSerializer(changed, many=True).data,
+            "cursor": str(cursor) if cursor is not None else None,
+        })
+
+
+class JobExportView(APIView):
+    """
+    GET /api/jobs/<id>/export/?fmt=ndjson|csv|zip&after=<item_id>&limit=<n>
+
+    Resultados do job em streaming, lidos do banco em lotes (export.py),
+    sem montar a resposta inteira na memória. Itens em ordem de id: para
+    retomar, `after` = id do último item recebido (no ZIP, o conteúdo de
+    _cursor.txt; cada ZIP leva no máximo EXPORT_ZIP_MAX_ITEMS itens). `fmt` e não `format`,
+    que o DRF reserva para o renderer.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, job_id):
+        fmt = request.query_params.get("fmt", "ndjson")
+        if fmt not in export.CONTENT_TYPES:
+            return Response({"detail": f"'fmt' deve ser um de: {', '.join(export.CONTENT_TYPES)}."}, status=400)
+        try:
+            after = request.query_params.get("after")
+            after = uuid.UUID(after) if after else None
+            limit = int(request.query_params.get("limit", 0)) or None
+            if limit is not None and limit < 0:
+                raise ValueError("limit negativo")
+        except ValueError:
+            return Response({"detail": "Parâmetros 'after'/'limit' inválidos."}, status=400)
+        if fmt == "zip":
+            limit = min(limit or settings.EXPORT_ZIP_MAX_ITEMS, settings.EXPORT_ZIP_MAX_ITEMS)
+        if not Job.objects.filter(id=job_id).exclude(status="DELETING").exists():
+            return Response({"detail": "Job não encontrado."}, status=404)
+
+        write = {"ndjson": export.ndjson, "csv": export.csv_rows, "zip": export.zip_texts}[fmt]
+        resp = StreamingHttpResponse(write(export.rows(job_id, after, limit)),
+                                     content_type=export.CONTENT_TYPES[fmt])
+        suffix = f"-after-{after}" if after else ""
+        resp["Content-Disposition"] = f'attachment; filename="job-{job_id}{suffix}.{fmt}"'
+        print(f"[EXPORT] {job_id} fmt={fmt} after={after} limit={limit}")
+        return resp
 
+
+class SearchView(APIView):
+    """
+    GET /api/search/?q=&job_id=&page=&page_size=
+
+    Itens (imagens e páginas) cujo texto casa com q, por relevância, com um
+    trecho destacado. Usa o índice de busca do banco (search.py); page vai
+    até SEARCH_MAX_RESULTS resultados.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        q = (request.query_params.get("q") or "").strip()
+        if not q:
+            return Response({"detail": "Informe 'q'."}, status=400)
+        try:
+            page = max(1, int(request.query_params.get("page", 1)))
+            page_size = min(max(1, int(request.query_params.get("page_size", settings.SEARCH_PAGE_SIZE))),
+                            settings.SEARCH_MAX_PAGE_SIZE)
+            job_id = request.query_params.get("job_id")
+            job_id = str(uuid.UUID(job_id)) if job_id else None
+        except ValueError:
+            return Response({"detail": "Parâmetros 'page'/'page_size'/'job_id' inválidos."}, status=400)
+        offset = (page - 1) * page_size
+        if offset >= settings.SEARCH_MAX_RESULTS:
+            return Response({"detail": f"Só os primeiros {settings.SEARCH_MAX_RESULTS} resultados; refine a busca."},
+                            status=400)
+
+        limit = min(page_size, settings.SEARCH_MAX_RESULTS - offset)
+        with span("search"):
+            # um a mais para saber se há próxima página sem COUNT(*)
+            results = search.search(q, limit + 1, offset, job_id=job_id,
+                                    snippet_words=settings.SEARCH_SNIPPET_WORDS)
+        more = len(results) > limit and offset + limit < settings.SEARCH_MAX_RESULTS
+        print(f"[SEARCH] q={q!r} job={job_id} page={page} hits={min(len(results), limit)}")
+        return Response({
+            "q": q,
+            "page": page,
+            "page_size": page_size,
+            "next": page + 1 if more else None,
+            "results": results[:limit],
+        })
@@ -66,6 +66,8 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "dev.sqlite3",
+            # vários processos de OCR (WORKER_PROCESSES) escrevendo no mesmo arquivo
+            "OPTIONS": {"timeout": 20},
         }
     }
 
@@ -81,7 +83,66 @@ REST_FRAMEWORK = {
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1") 
 S3_BUCKET = os.getenv("S3_BUCKET", "ocr-aws-nuvem-bucket")
 SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL", "")
+# fila "interactive" para jobs pequenos (não esperam atrás de um job de milhares de imagens);
+# vazia = todas as lanes usam SQS_QUEUE_URL
+SQS_QUEUE_URL_INTERACTIVE = os.getenv("SQS_QUEUE_URL_INTERACTIVE", "")
+SQS_LANES = ("interactive", "bulk")
+LANE_INTERACTIVE_MAX_ITEMS = int(os.getenv("LANE_INTERACTIVE_MAX_ITEMS", "20"))  # acima disso: bulk
+# peso de cada lane no poller do worker (mensagens recebidas quando as duas têm fila)
+SQS_LANE_WEIGHTS = os.getenv("SQS_LANE_WEIGHTS", "interactive:4,bulk:1")
 DDB_TABLE_LOGS = os.getenv("DDB_TABLE_LOGS", "ocr-aws-crud-logs")
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "16"))  # uploads paralelos por request
+# uploads acima disto vão em multipart, um bloco por vez (mínimo do S3: 5 MB)
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))
+# arquivos maiores que isto vão para disco (TemporaryUploadedFile) em vez da memória
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("FILE_UPLOAD_MAX_MEMORY_SIZE", str(2 * 1024 * 1024)))
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000"))      # eventos pendentes no processo
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "1.0"))
+
+# Upload direto navegador -> S3 (URLs pré-assinadas)
+PRESIGNED_URL_EXPIRES = int(os.getenv("PRESIGNED_URL_EXPIRES", "3600"))
+MULTIPART_THRESHOLD = int(os.getenv("MULTIPART_THRESHOLD", str(64 * 1024 * 1024)))
+MULTIPART_PART_SIZE = int(os.getenv("MULTIPART_PART_SIZE", str(16 * 1024 * 1024)))  # mínimo do S3: 5 MB
+
+# Exclusão assíncrona de jobs (app/jobs/cleanup.py)
+CLEANUP_S3_CONCURRENCY = int(os.getenv("CLEANUP_S3_CONCURRENCY", "8"))  # delete_objects em paralelo
+CLEANUP_ROW_BATCH = int(os.getenv("CLEANUP_ROW_BATCH", "5000"))          # linhas por DELETE
+BULK_DELETE_MAX_JOBS = int(os.getenv("BULK_DELETE_MAX_JOBS", "500"))
 
 # Regras de job
 SQS_RETENTION_SECONDS = int(os.getenv("SQS_RETENTION_SECONDS", "172800"))  # 2 dias
+
+# Expiração de jobs vencidos (app/jobs/expiry.py)
+EXPIRE_BATCH = int(os.getenv("EXPIRE_BATCH", "500"))                  # jobs por lote (2 UPDATEs)
+EXPIRE_MAX_BATCHES = int(os.getenv("EXPIRE_MAX_BATCHES", "20"))       # lotes por rodada
+EXPIRE_GRACE_SECONDS = int(os.getenv("EXPIRE_GRACE_SECONDS", "3600")) # folga depois do prazo
+EXPIRE_PURGE_S3 = os.getenv("EXPIRE_PURGE_S3", "0") == "1"            # apaga os objetos no S3
+EXPIRE_CLEAR_TEXT = os.getenv("EXPIRE_CLEAR_TEXT", "0") == "1"        # apaga o ocr_text dos itens
+
+# Motor/idioma de OCR (cada job pode pedir outro; ver worker/engines.py). tesseract
+# não vem no worker: para oferecer, instale pytesseract + o binário e use "easyocr,tesseract"
+OCR_ENGINES = [e for e in os.getenv("OCR_ENGINES", "easyocr").split(",") if e]
+OCR_DEFAULT_ENGINE = os.getenv("OCR_DEFAULT_ENGINE", "easyocr")
+OCR_DEFAULT_LANGUAGE = os.getenv("OCR_DEFAULT_LANGUAGE", "en")
+# idiomas aceitos em ocr_language; cada combinação nova carrega outro modelo no worker
+OCR_LANGUAGES = [l for l in os.getenv("OCR_LANGUAGES", "en,pt,es").split(",") if l]
+
+# Cache de OCR por conteúdo (sha256)
+OCR_CACHE_TTL_DAYS = int(os.getenv("OCR_CACHE_TTL_DAYS", "30"))
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "200000"))
+
+# Progresso incremental (long-poll): espera máxima por request e intervalo entre checagens
+PROGRESS_MAX_WAIT = int(os.getenv("PROGRESS_MAX_WAIT", "25"))
+PROGRESS_POLL_INTERVAL = float(os.getenv("PROGRESS_POLL_INTERVAL", "1.0"))
+# janela re-enviada antes do cursor: commit que chega fora da ordem de updated_at não se perde
+PROGRESS_CURSOR_LAG = float(os.getenv("PROGRESS_CURSOR_LAG", "10"))
+
+# Exportação em streaming (app/jobs/export.py): linhas por fetch do cursor / pedaço da resposta
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+EXPORT_ZIP_MAX_ITEMS = int(os.getenv("EXPORT_ZIP_MAX_ITEMS", "50000"))  # por resposta; o resto com after=
+
+# Busca no texto de OCR (app/jobs/search.py)
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "100"))
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))  # limita o OFFSET das páginas fundas
+SEARCH_SNIPPET_WORDS = int(os.getenv("SEARCH_SNIPPET_WORDS", "12"))
@@ -1,6 +1,7 @@
 # backend/app/urls.py
 from django.urls import path, include
 from django.http import JsonResponse
+from app.jobs.metrics import metrics_view
 
 def health(_request):
     return JsonResponse({"status": "ok"})
@@ -8,5 +9,6 @@ def health(_request):
 urlpatterns = [
     path("health", health),   # /health (sem barra final)
     path("health/", health),  # /health/ (com barra final)
+    path("metrics", metrics_view),  # Prometheus
     path("api/", include("app.jobs.urls")),
 ]
@@ -0,0 +1,18 @@
+"""
+Config do Gunicorn (carregada pelo unit systemd, ver scripts/deploy-web.sh).
+
+Com PROMETHEUS_MULTIPROC_DIR cada worker grava as métricas em arquivos
+próprios nesse diretório; quando um worker morre (reinício, timeout) os
+gauges "live*" dele precisam sair da soma do /metrics.
+"""
+import os
+
+
+def child_exit(server, worker):
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:  # métricas são opcionais
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,434 @@
+"""
+Benchmark ponta a ponta: POST /api/jobs/ (JobsView de verdade) -> SQS ->
+worker (process_message / process_batch de verdade) -> DONE no banco.
+
+S3, SQS e DynamoDB são substituídos em processo: stubs em memória
+(--aws stub, padrão, sem custo de rede) ou moto (--aws moto). O banco é
+um banco de teste descartável criado com as migrations: SQLite (arquivo
+temporário) ou Postgres quando RDS_HOST estiver definido.
+
+    python bench/bench_e2e.py --jobs 20 --images-per-job 10 --workers 2
+    python bench/bench_e2e.py --ocr real --corpus ./amostras --out results.jsonl
+
+Mede: requisições de ingestão/s, latência fila->DONE (p50/p90/p99),
+imagens/s por core no OCR e queries no banco por item. Saída: uma linha
+JSON (com o commit atual) para comparar entre commits.
+"""
+import os, sys, io, json, time, uuid, argparse, tempfile, threading, subprocess
+from collections import defaultdict, deque
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "worker"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+# antes do django.setup() (feito ao importar worker/main.py)
+os.environ.setdefault("S3_BUCKET", "bench-bucket")
+os.environ.setdefault("SQS_QUEUE_URL", "https://sqs.us-east-1.amazonaws.com/000000000000/bench")
+os.environ.setdefault("DDB_TABLE_LOGS", "bench-logs")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+from botocore.exceptions import ClientError
+
+
+# ==============================================================================
+# Stubs em memória (só as chamadas que o código usa)
+# ==============================================================================
+class StubS3:
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **kw):
+        with self._lock:
+            self.objects[(Bucket, Key)] = Body if isinstance(Body, bytes) else Body.read()
+        return {}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj)
+
+    def _get(self, Bucket, Key, op):
+        with self._lock:
+            data = self.objects.get((Bucket, Key))
+        if data is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": Key}}, op)
+        return data
+
+    def get_object(self, Bucket, Key, **kw):
+        return {"Body": io.BytesIO(self._get(Bucket, Key, "GetObject"))}
+
+    def head_object(self, Bucket, Key, **kw):
+        return {"ContentLength": len(self._get(Bucket, Key, "HeadObject"))}
+
+
+class StubSQS:
+    def __init__(self):
+        self._queues = defaultdict(deque)  # url -> deque[(msg_id, body, sent_ms)]
+        self._inflight = {}                # receipt -> (url, msg_id, body, sent_ms, visible_at)
+        self._lock = threading.Lock()
+        self.delete_calls = 0
+
+    def send_message_batch(self, QueueUrl, Entries):
+        ok = []
+        with self._lock:
+            for e in Entries:
+                mid = str(uuid.uuid4())
+                self._queues[QueueUrl].append((mid, e["MessageBody"], int(time.time() * 1000)))
+                ok.append({"Id": e["Id"], "MessageId": mid})
+        return {"Successful": ok, "Failed": []}
+
+    def send_message(self, QueueUrl, MessageBody, **kw):
+        r = self.send_message_batch(QueueUrl, [{"Id": "0", "MessageBody": MessageBody}])
+        return {"MessageId": r["Successful"][0]["MessageId"]}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, VisibilityTimeout=30, **kw):
+        now = time.time()
+        out = []
+        with self._lock:
+            # mensagens com visibility vencido voltam para a fila
+            for rh, (url, mid, body, sent, vis) in list(self._inflight.items()):
+                if vis <= now:
+                    del self._inflight[rh]
+                    self._queues[url].append((mid, body, sent))
+            ready = self._queues[QueueUrl]
+            while ready and len(out) < MaxNumberOfMessages:
+                mid, body, sent = ready.popleft()
+                rh = str(uuid.uuid4())
+                self._inflight[rh] = (QueueUrl, mid, body, sent, now + VisibilityTimeout)
+                out.append({"MessageId": mid, "ReceiptHandle": rh, "Body": body,
+                            "Attributes": {"SentTimestamp": str(sent)}})
+        return {"Messages": out} if out else {}
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        with self._lock:
+            self.delete_calls += 1
+            self._inflight.pop(ReceiptHandle, None)
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        with self._lock:
+            self.delete_calls += 1
+            for e in Entries:
+                self._inflight.pop(e["ReceiptHandle"], None)
+        return {"Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        return {"Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []}
+
+
+class StubTable:
+    def __init__(self):
+        self.items = []
+
+    def put_item(self, Item):
+        self.items.append(Item)
+
+    def batch_writer(self):
+        table = self
+
+        class _Writer:
+            def __enter__(self):
+                return table
+
+            def __exit__(self, *exc):
+                return False
+        return _Writer()
+
+
+def moto_clients(settings):
+    """Clientes boto3 novos dentro do mock_aws (moto em processo)."""
+    import boto3
+    from moto import mock_aws
+    mock = mock_aws()
+    mock.start()
+    s3 = boto3.client("s3", region_name=settings.AWS_REGION)
+    sqs = boto3.client("sqs", region_name=settings.AWS_REGION)
+    ddb = boto3.resource("dynamodb", region_name=settings.AWS_REGION)
+    s3.create_bucket(Bucket=settings.S3_BUCKET)
+    settings.SQS_QUEUE_URL = sqs.create_queue(QueueName="bench")["QueueUrl"]
+    table = ddb.create_table(
+        TableName=settings.DDB_TABLE_LOGS, BillingMode="PAY_PER_REQUEST",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"},
+                              {"AttributeName": "sk", "AttributeType": "S"}])
+    return s3, sqs, table, mock
+
+
+# ==============================================================================
+# Medição
+# ==============================================================================
+class QueryCounter:
+    """execute_wrapper do Django: conta queries de todas as threads."""
+
+    def __init__(self):
+        self.n = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.n += 1
+        return execute(sql, params, many, context)
+
+
+class FakeEngine:
+    """OCR de mentira com custo fixo: mede o pipeline sem o modelo."""
+    batch_same_size = False
+
+    def __init__(self, ms: float):
+        self.name, self.lang, self.ms = "fake", "en", ms
+
+    def readtext(self, img):
+        time.sleep(self.ms / 1000)
+        return [f"fake {img.shape[0]}x{img.shape[1]}"]
+
+    def readtext_batched(self, imgs, batch_size=16):
+        return [self.readtext(img) for img in imgs]
+
+
+class TimedEngine:
+    """Envolve um motor contando imagens e o tempo gasto dentro do OCR."""
+
+    def __init__(self, engine, stats):
+        self.engine, self.stats = engine, stats
+        self.name, self.lang = engine.name, engine.lang
+        self.batch_same_size = engine.batch_same_size
+
+    def _timed(self, fn, n, *args, **kw):
+        t = time.perf_counter()
+        try:
+            return fn(*args, **kw)
+        finally:
+            with self.stats["lock"]:
+                self.stats["images"] += n
+                self.stats["wall_s"] += time.perf_counter() - t
+
+    def readtext(self, img):
+        return self._timed(self.engine.readtext, 1, img)
+
+    def readtext_batched(self, imgs, batch_size=16):
+        return self._timed(self.engine.readtext_batched, len(imgs), imgs, batch_size=batch_size)
+
+
+def percentiles(values, ps=(50, 90, 99)):
+    if not values:
+        return {f"p{p}": None for p in ps}
+    v = sorted(values)
+    out = {f"p{p}": round(v[min(len(v) - 1, int(len(v) * p / 100))], 1) for p in ps}
+    out["max"] = round(v[-1], 1)
+    return out
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+# ==============================================================================
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=10)
+    ap.add_argument("--images-per-job", type=int, default=8)
+    ap.add_argument("--corpus", help="pasta com imagens (senão gera sintéticas; repetidas viram hit de cache)")
+    ap.add_argument("--aws", choices=["stub", "moto"], default="stub")
+    ap.add_argument("--ocr", choices=["fake", "real"], default="fake",
+                    help="fake = custo fixo (--fake-ocr-ms); real = motor padrão do worker")
+    ap.add_argument("--fake-ocr-ms", type=float, default=20.0)
+    ap.add_argument("--workers", type=int, default=1, help="threads de worker consumindo a fila")
+    ap.add_argument("--batch-size", type=int, default=1, help="1 = process_message; >1 = process_batch")
+    ap.add_argument("--group-commit", type=int, default=0,
+                    help="N > 1: resultados gravados em grupos de até N (commit_results) e acks em lote")
+    ap.add_argument("--out", help="acrescenta a linha JSON neste arquivo")
+    ap.add_argument("--verbose", action="store_true", help="mantém os logs do backend/worker")
+    args = ap.parse_args()
+
+    import main as worker
+    from django.conf import settings
+    from django.db import connection, connections
+    from django.test import Client
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from app.jobs import aws_clients, ocr_cache, views
+    from app.jobs.models import Job, JobItem
+    from bench_ocr_batch import synthetic_corpus, load_corpus
+
+    # ---- banco descartável com as migrations ----
+    tmpdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    if connection.vendor == "sqlite":
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+    real_stdout = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+    db_name = settings.DATABASES["default"]["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    # ---- AWS em processo ----
+    mock = None
+    if args.aws == "moto":
+        s3, sqs, table, mock = moto_clients(settings)
+    else:
+        s3, sqs, table = StubS3(), StubSQS(), StubTable()
+    aws_clients.s3 = ocr_cache.s3 = worker.s3 = s3
+    aws_clients.sqs = worker.sqs = sqs
+    aws_clients.ddb_table = aws_clients.audit_log.table = table
+    queue_url = settings.SQS_QUEUE_URL
+
+    # ---- OCR ----
+    ocr_stats = {"images": 0, "wall_s": 0.0, "lock": threading.Lock()}
+    if args.ocr == "real":
+        # cada chamada de OCR ocupa OCR_TORCH_THREADS cores (como no modo pool)
+        try:
+            import torch
+            torch.set_num_threads(worker.OCR_TORCH_THREADS)
+        except ImportError:
+            pass
+    engines = {}
+    real_get_engine = worker.get_engine
+
+    def get_engine(engine=None, lang=None):
+        key = (engine, lang)
+        if key not in engines:
+            eng = FakeEngine(args.fake_ocr_ms) if args.ocr == "fake" else real_get_engine(engine, lang)
+            engines[key] = TimedEngine(eng, ocr_stats)
+        return engines[key]
+    worker.get_engine = get_engine
+    get_engine()  # carrega/aquece fora da medição
+
+    # ---- corpus ----
+    n_images = args.jobs * args.images_per_job
+    raws = load_corpus(args.corpus) if args.corpus else synthetic_corpus(n_images)
+    if not raws:
+        sys.stdout = real_stdout
+        sys.exit(f"nenhuma imagem em {args.corpus}")
+    raws = [raws[i % len(raws)] for i in range(n_images)]
+
+    queries = QueryCounter()
+    latencies_ms = []
+    lat_lock = threading.Lock()
+    stop = threading.Event()
+
+    def worker_loop():
+        committer = acks = None
+        if args.group_commit > 1:
+            from committer import GroupBuffer
+            # sem a thread de prazo: o flush roda nesta thread (as queries entram na contagem)
+            acks = GroupBuffer(worker.ack_many, 10, 0)
+
+            def on_done(m, ok, err):
+                if ok:
+                    acks.add(m)
+                    with lat_lock:
+                        latencies_ms.append(time.time() * 1000 - int(m["Attributes"]["SentTimestamp"]))
+            committer = GroupBuffer(lambda entries: worker.commit_results(entries, on_done), args.group_commit, 0)
+
+        with connection.execute_wrapper(queries):
+            while not stop.is_set():
+                resp = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=min(10, args.batch_size),
+                                           WaitTimeSeconds=0, VisibilityTimeout=300,
+                                           AttributeNames=["SentTimestamp"])
+                msgs = resp.get("Messages", [])
+                for m in msgs:
+                    m["QueueUrl"] = queue_url
+                if not msgs:
+                    if committer is not None:
+                        committer.flush()
+                        acks.flush()
+                    time.sleep(0.01)
+                    continue
+                if committer is not None:
+                    for m, ok, _ in worker.process_batch(msgs, committer):
+                        if ok:
+                            on_done(m, ok, None)
+                    continue
+                if args.batch_size == 1:
+                    worker.process_message(msgs[0])
+                    results = [(msgs[0], True, None)]
+                else:
+                    results = worker.process_batch(msgs)
+                now_ms = time.time() * 1000
+                for m, ok, _ in results:
+                    if ok:
+                        sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=m["ReceiptHandle"])
+                        with lat_lock:
+                            latencies_ms.append(now_ms - int(m["Attributes"]["SentTimestamp"]))
+        connections.close_all()
+
+    threads = [threading.Thread(target=worker_loop, name=f"bench-worker-{i}", daemon=True)
+               for i in range(args.workers)]
+    for t in threads:
+        t.start()
+
+    # ---- ingestão (JobsView real via test client) ----
+    client = Client()
+    job_ids = []
+    t0 = time.perf_counter()
+    with connection.execute_wrapper(queries):
+        for j in range(args.jobs):
+            files = [SimpleUploadedFile(f"img{j}_{i}.png", raws[j * args.images_per_job + i],
+                                        content_type="image/png") for i in range(args.images_per_job)]
+            r = client.post("/api/jobs/", {"name": f"bench-{j}", "images": files})
+            assert r.status_code == 201, r.content[:300]
+            job_ids.append(r.json()["id"])
+    ingest_s = time.perf_counter() - t0
+    ingest_queries = queries.n
+
+    # ---- espera a fila esvaziar (todos os itens DONE/ERROR) ----
+    while JobItem.objects.filter(job_id__in=job_ids).exclude(status__in=["DONE", "ERROR"]).exists():
+        time.sleep(0.05)
+    total_s = time.perf_counter() - t0
+    stop.set()
+    for t in threads:
+        t.join()
+    aws_clients.audit_log.flush()
+
+    n_items = JobItem.objects.filter(job_id__in=job_ids).count()
+    n_done = Job.objects.filter(id__in=job_ids, status="DONE").count()
+    worker_queries = queries.n - ingest_queries
+
+    result = {
+        "bench": "e2e",
+        "commit": git_commit(),
+        "db": connection.vendor,
+        "aws": args.aws,
+        "ocr": args.ocr if args.ocr == "real" else f"fake:{args.fake_ocr_ms}ms",
+        "jobs": args.jobs,
+        "images_per_job": args.images_per_job,
+        "workers": args.workers,
+        "batch_size": args.batch_size,
+        "group_commit": args.group_commit,
+        "items": n_items,
+        "jobs_done": n_done,
+        "ingest_s": round(ingest_s, 3),
+        "ingest_rps": round(args.jobs / ingest_s, 2),
+        "ingest_images_per_s": round(n_images / ingest_s, 1),
+        "total_s": round(total_s, 3),
+        "items_per_s": round(n_items / total_s, 2),
+        "queue_to_done_ms": percentiles(latencies_ms),
+        "ocr_images": ocr_stats["images"],
+        "ocr_s": round(ocr_stats["wall_s"], 3),
+        # core-segundos = tempo dentro do OCR x threads do torch; só faz sentido com o modelo real
+        "ocr_images_per_s_per_core": (round(ocr_stats["images"] / (ocr_stats["wall_s"] * worker.OCR_TORCH_THREADS), 2)
+                                      if args.ocr == "real" and ocr_stats["wall_s"] > 0 else None),
+        "cache_hits": ocr_cache.STATS["hit"],
+        "queries_per_item_ingest": round(ingest_queries / max(1, n_items), 2),
+        "queries_per_item_worker": round(worker_queries / max(1, n_items), 2),
+        "sqs_delete_calls_per_item": (round(sqs.delete_calls / max(1, n_items), 2)
+                                      if hasattr(sqs, "delete_calls") else None),
+    }
+
+    connection.creation.destroy_test_db(db_name, verbosity=0)
+    if mock:
+        mock.stop()
+    sys.stdout = real_stdout
+    line = json.dumps(result)
+    print(line, flush=True)
+    if args.out:
+        with open(args.out, "a") as f:
+            f.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark de lanes: latência fila->DONE por lane com carga mista.
+
+Um job bulk grande entra primeiro e, enquanto ele ocupa o worker, chegam
+jobs interactive de 1 imagem. Roda o mesmo cenário com uma fila só
+("single", como antes das lanes) e com as duas filas + poller ponderado
+("lanes"), usando JobsView, LanePoller e process_message de verdade (AWS
+em stubs de bench_e2e, banco de teste descartável).
+
+    python bench/bench_lanes.py --bulk-items 400 --interactive-jobs 20 --workers 2
+
+Saída: uma linha JSON com p50/p90/p99 por lane e por modo.
+"""
+import os, sys, json, time, argparse, tempfile, threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from bench_e2e import StubS3, StubSQS, StubTable, FakeEngine, percentiles, git_commit  # noqa: E402 (prepara o env)
+
+INTERACTIVE_URL = "https://sqs.us-east-1.amazonaws.com/000000000000/bench-interactive"
+
+
+def run_mode(mode, args, worker, client, sqs):
+    from django.conf import settings
+    from django.db import connections
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from app.jobs.models import JobItem
+    from lanes import LanePoller, configured_lanes
+    from bench_ocr_batch import synthetic_corpus
+
+    settings.SQS_QUEUE_URL_INTERACTIVE = INTERACTIVE_URL if mode == "lanes" else ""
+    settings.SQS_LANE_WEIGHTS = args.weights
+    poller = LanePoller(sqs, configured_lanes(settings), visibility_timeout=300)
+
+    latencies = {"interactive": [], "bulk": []}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def worker_loop():
+        while not stop.is_set():
+            msgs = poller.receive(1, wait=0)
+            if not msgs:
+                time.sleep(0.005)
+                continue
+            m = msgs[0]
+            worker.process_message(m)
+            sqs.delete_message(QueueUrl=m["QueueUrl"], ReceiptHandle=m["ReceiptHandle"])
+            lane = json.loads(m["Body"]).get("lane", "bulk")
+            with lock:
+                latencies[lane].append(time.time() * 1000 - int(m["Attributes"]["SentTimestamp"]))
+        connections.close_all()
+
+    threads = [threading.Thread(target=worker_loop, daemon=True) for _ in range(args.workers)]
+    for t in threads:
+        t.start()
+
+    # semente por modo: imagens repetidas entre modos virariam hit de cache
+    raws = synthetic_corpus(args.bulk_items + args.interactive_jobs, seed=sum(map(ord, mode)))
+    job_ids = []
+    t0 = time.perf_counter()
+    files = [SimpleUploadedFile(f"bulk{i}.png", raws[i], content_type="image/png")
+             for i in range(args.bulk_items)]
+    r = client.post("/api/jobs/", {"name": f"bulk-{mode}", "images": files})
+    assert r.status_code == 201, r.content[:300]
+    job_ids.append(r.json()["id"])
+    for j in range(args.interactive_jobs):
+        time.sleep(args.interactive_every_ms / 1000)
+        f = SimpleUploadedFile(f"small{j}.png", raws[args.bulk_items + j], content_type="image/png")
+        r = client.post("/api/jobs/", {"name": f"small-{mode}-{j}", "images": [f]})
+        assert r.status_code == 201, r.content[:300]
+        job_ids.append(r.json()["id"])
+
+    while JobItem.objects.filter(job_id__in=job_ids).exclude(status__in=["DONE", "ERROR"]).exists():
+        time.sleep(0.05)
+    total_s = time.perf_counter() - t0
+    stop.set()
+    for t in threads:
+        t.join()
+    return {
+        "total_s": round(total_s, 3),
+        "items_per_s": round((args.bulk_items + args.interactive_jobs) / total_s, 2),
+        "interactive_ms": percentiles(latencies["interactive"]),
+        "bulk_ms": percentiles(latencies["bulk"]),
+        "received": poller.received,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bulk-items", type=int, default=300, help="imagens do job grande")
+    ap.add_argument("--interactive-jobs", type=int, default=20, help="jobs de 1 imagem")
+    ap.add_argument("--interactive-every-ms", type=float, default=100.0, help="intervalo entre jobs pequenos")
+    ap.add_argument("--fake-ocr-ms", type=float, default=20.0)
+    ap.add_argument("--workers", type=int, default=2, help="threads de worker consumindo as filas")
+    ap.add_argument("--weights", default="interactive:4,bulk:1")
+    ap.add_argument("--modes", default="single,lanes")
+    ap.add_argument("--out", help="acrescenta a linha JSON neste arquivo")
+    ap.add_argument("--verbose", action="store_true", help="mantém os logs do backend/worker")
+    args = ap.parse_args()
+
+    import main as worker
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+    from app.jobs import aws_clients, ocr_cache
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-lanes-")
+    if connection.vendor == "sqlite":
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+    real_stdout = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+    db_name = settings.DATABASES["default"]["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    s3, sqs, table = StubS3(), StubSQS(), StubTable()
+    aws_clients.s3 = ocr_cache.s3 = worker.s3 = s3
+    aws_clients.sqs = worker.sqs = sqs
+    aws_clients.ddb_table = aws_clients.audit_log.table = table
+    engine = FakeEngine(args.fake_ocr_ms)
+    worker.get_engine = lambda engine_name=None, lang=None: engine
+
+    # o job grande vai num POST só (na vida real ele viria por /api/jobs/uploads/)
+    settings.DATA_UPLOAD_MAX_NUMBER_FILES = None
+    client = Client()
+    result = {"bench": "lanes", "commit": git_commit(), "db": connection.vendor,
+              "ocr": f"fake:{args.fake_ocr_ms}ms", "workers": args.workers,
+              "bulk_items": args.bulk_items, "interactive_jobs": args.interactive_jobs,
+              "weights": args.weights}
+    for mode in args.modes.split(","):
+        result[mode] = run_mode(mode, args, worker, client, sqs)
+
+    aws_clients.audit_log.flush()
+    connection.creation.destroy_test_db(db_name, verbosity=0)
+    sys.stdout = real_stdout
+    line = json.dumps(result)
+    print(line, flush=True)
+    if args.out:
+        with open(args.out, "a") as f:
+            f.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
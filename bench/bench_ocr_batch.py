@@ -0,0 +1,90 @@
+"""
+Benchmark: OCR item a item (readtext) x em lote (readtext_batched).
+
+Mede imagens/s por core com o mesmo agrupamento/padding do worker
+(worker/batching.py). Usa as imagens de --corpus (png/jpg) ou gera imagens
+sintéticas com texto.
+
+    python bench/bench_ocr_batch.py --corpus ./amostras --batch-sizes 1,4,8,16 --threads 1
+
+Saída: uma linha JSON por configuração (fácil de comparar entre commits).
+"""
+import os, sys, glob, json, time, argparse, random, io
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "worker"))
+
+from batching import decode_image, group_by_size, pad_to_common
+
+
+def synthetic_corpus(n: int, seed: int = 42) -> list:
+    from PIL import Image, ImageDraw
+    rnd = random.Random(seed)
+    words = "invoice total amount date customer order number paid tax item price".split()
+    out = []
+    for _ in range(n):
+        w, h = rnd.randint(500, 900), rnd.randint(200, 500)
+        img = Image.new("RGB", (w, h), "white")
+        d = ImageDraw.Draw(img)
+        for y in range(10, h - 20, 30):
+            d.text((10, y), " ".join(rnd.choice(words) for _ in range(6)), fill="black")
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        out.append(buf.getvalue())
+    return out
+
+
+def load_corpus(path: str) -> list:
+    files = sorted(f for ext in ("png", "jpg", "jpeg", "tif", "tiff")
+                   for f in glob.glob(os.path.join(path, f"*.{ext}")))
+    return [open(f, "rb").read() for f in files]
+
+
+def run_single(reader, raws):
+    t0 = time.perf_counter()
+    for raw in raws:
+        reader.readtext(raw, detail=0, paragraph=True)
+    return time.perf_counter() - t0
+
+
+def run_batched(reader, raws, batch_size, recog_batch, max_pad):
+    t0 = time.perf_counter()
+    for i in range(0, len(raws), batch_size):
+        imgs = [decode_image(r) for r in raws[i:i + batch_size]]
+        for group in group_by_size([im.shape[:2] for im in imgs], max_pad):
+            reader.readtext_batched(pad_to_common([imgs[j] for j in group]),
+                                    batch_size=recog_batch, detail=0, paragraph=True)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", help="pasta com imagens (senão gera sintéticas)")
+    ap.add_argument("-n", type=int, default=32, help="nº de imagens sintéticas")
+    ap.add_argument("--batch-sizes", default="1,4,8,16")
+    ap.add_argument("--recog-batch", type=int, default=16)
+    ap.add_argument("--max-pad", type=float, default=1.5)
+    ap.add_argument("--threads", type=int, default=1, help="torch threads (1 = por core)")
+    ap.add_argument("--lang", default="en")
+    args = ap.parse_args()
+
+    import torch, easyocr
+    torch.set_num_threads(args.threads)
+    raws = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.n)
+    reader = easyocr.Reader([args.lang], gpu=False)
+    reader.readtext(raws[0], detail=0)  # aquecimento
+
+    for bs in (int(x) for x in args.batch_sizes.split(",")):
+        if bs == 1:
+            secs = run_single(reader, raws)
+        else:
+            secs = run_batched(reader, raws, bs, args.recog_batch, args.max_pad)
+        print(json.dumps({
+            "bench": "ocr_batch", "images": len(raws), "batch_size": bs,
+            "threads": args.threads, "seconds": round(secs, 3),
+            "images_per_s_per_core": round(len(raws) / secs / args.threads, 3),
+        }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: precisão x latência do pré-processamento (worker/preprocess.py).
+
+Para cada combinação de --max-sides x --text-px roda pré-processamento +
+EasyOCR em todas as imagens de --corpus. Precisão = similaridade
+(difflib) com o texto de referência <imagem>.txt quando existir; senão com
+a saída sem pré-processamento (imagem original).
+
+    python bench/bench_preprocess.py --corpus ./amostras --max-sides 0,1280,1920,2560 --text-px 0,24,32
+
+Saída: uma linha JSON por configuração.
+"""
+import os, sys, glob, json, time, argparse, difflib, statistics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "worker"))
+
+from preprocess import preprocess, PreprocessConfig
+
+
+def load_corpus(path: str) -> list:
+    out = []
+    for f in sorted(glob.glob(os.path.join(path, "*"))):
+        if os.path.splitext(f)[1].lower() not in (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".webp"):
+            continue
+        ref = os.path.splitext(f)[0] + ".txt"
+        out.append({
+            "name": os.path.basename(f),
+            "raw": open(f, "rb").read(),
+            "ref": open(ref, encoding="utf-8").read() if os.path.exists(ref) else None,
+        })
+    return out
+
+
+def ocr(reader, arrays) -> str:
+    parts = []
+    for a in arrays:
+        parts.extend(reader.readtext(a, detail=0, paragraph=True))
+    return " ".join(parts).strip()
+
+
+def similarity(a: str, b: str) -> float:
+    norm = lambda s: " ".join(s.lower().split())
+    return difflib.SequenceMatcher(None, norm(a), norm(b)).ratio()
+
+
+def p95(xs):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(0.95 * (len(xs) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", required=True, help="pasta com imagens (+ <nome>.txt opcional)")
+    ap.add_argument("--max-sides", default="0,1280,1920,2560")
+    ap.add_argument("--text-px", default="0,24,32")
+    ap.add_argument("--tile-side", type=int, default=0)
+    ap.add_argument("--no-gray", action="store_true")
+    ap.add_argument("--threads", type=int, default=1)
+    ap.add_argument("--lang", default="en")
+    args = ap.parse_args()
+
+    import torch, easyocr
+    torch.set_num_threads(args.threads)
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        sys.exit(f"nenhuma imagem em {args.corpus}")
+    reader = easyocr.Reader([args.lang], gpu=False)
+
+    # referência: texto de <nome>.txt ou OCR da imagem original
+    for doc in corpus:
+        if doc["ref"] is None:
+            doc["ref"] = ocr(reader, [doc["raw"]])
+
+    for max_side in (int(x) for x in args.max_sides.split(",")):
+        for text_px in (int(x) for x in args.text_px.split(",")):
+            cfg = PreprocessConfig(grayscale=not args.no_gray, max_side=max_side,
+                                   target_text_px=text_px, tile_side=args.tile_side)
+            pre_ms, total_ms, sims, steps = [], [], [], {}
+            for doc in corpus:
+                t0 = time.perf_counter()
+                arrays, timings = preprocess(doc["raw"], cfg)
+                t1 = time.perf_counter()
+                text = ocr(reader, arrays)
+                t2 = time.perf_counter()
+                pre_ms.append((t1 - t0) * 1000)
+                total_ms.append((t2 - t0) * 1000)
+                sims.append(similarity(text, doc["ref"]))
+                for k, v in timings.items():
+                    if k.endswith("_ms"):
+                        steps.setdefault(k, []).append(v)
+            print(json.dumps({
+                "bench": "preprocess", "images": len(corpus), "config": cfg.as_dict(),
+                "accuracy": round(statistics.mean(sims), 4),
+                "latency_ms_mean": round(statistics.mean(total_ms), 1),
+                "latency_ms_p95": round(p95(total_ms), 1),
+                "preprocess_ms_mean": round(statistics.mean(pre_ms), 1),
+                "steps_ms_mean": {k: round(statistics.mean(v), 2) for k, v in steps.items()},
+            }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
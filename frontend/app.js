@@ -1,9 +1,17 @@
 const API = location.origin; // mesmo host via Nginx
 
-async function listJobs(){
-  const r = await fetch(`${API}/api/jobs/`, {headers:{Accept:'application/json'}});
+// lista paginada por cursor: "Carregar mais" segue o link "next" da API
+const LIST_FIELDS = 'id,name,status,created_at,total_items,done_items';
+let jobsCache = [], jobsNext = null;
+
+async function listJobs(more){
+  const url = more && jobsNext ? jobsNext : `${API}/api/jobs/?fields=${LIST_FIELDS}`;
+  const r = await fetch(url, {headers:{Accept:'application/json'}});
   const data = await r.json();
-  renderJobs(data.results || []);
+  jobsCache = more ? jobsCache.concat(data.results || []) : (data.results || []);
+  jobsNext = data.next || null;
+  renderJobs(jobsCache);
+  document.getElementById('btnMore').style.display = jobsNext ? '' : 'none';
 }
 
 function esc(s){ return (s||'').replace(/[<>&]/g, m => ({'<':'&lt;','>':'&gt;','&':'&amp;'}[m])); }
@@ -27,20 +35,34 @@ function renderJobs(jobs){
   `).join('<hr>');
 }
 
+// progresso incremental: 1ª chamada traz tudo, depois long-poll só com o que mudou desde o cursor
+let jobWatch = 0;
 async function openJob(id){
   document.getElementById('jobDetail').style.display='block';
   document.getElementById('jobId').textContent=id;
-  await refreshJob(id);
-  if(window._jobTimer) clearInterval(window._jobTimer);
-  window._jobTimer = setInterval(()=>refreshJob(id), 4000);
+  const watch = ++jobWatch;           // abrir outro job encerra o loop anterior
+  const items = new Map();
+  let cursor = null;
+  while(watch === jobWatch){
+    try{
+      const q = cursor ? `?since=${cursor}&wait=25` : '';
+      const r = await fetch(`${API}/api/jobs/${id}/progress/${q}`, {headers:{Accept:'application/json'}});
+      if(!r.ok) break;
+      const p = await r.json();
+      if(watch !== jobWatch) break;
+      p.items.forEach(it => items.set(it.id, it));
+      cursor = p.cursor;
+      renderJob(p, items);
+      if(p.status === 'DONE' || p.status === 'ERROR') break;
+    }catch(e){
+      await new Promise(res => setTimeout(res, 4000));   // rede caiu: tenta de novo
+    }
+  }
 }
-
-async function refreshJob(id){
-  const r = await fetch(`${API}/api/jobs/${id}/`, {headers:{Accept:'application/json'}});
-  const j = await r.json();
+function renderJob(p, items){
   document.getElementById('jobInfo').textContent =
-    `status=${j.status} · itens=${j.total_items} · done=${j.done_items}`;
-  const items = (j.items || []).map(it => `
+    `status=${p.status} · itens=${p.total_items} · done=${p.done_items}`;
+  const html = [...items.values()].map(it => `
     <div class="card">
       <div><strong>Item:</strong> ${it.id} — status: ${it.status}</div>
       <div class="muted">S3: ${esc(it.s3_key||'-')}</div>
@@ -49,30 +71,93 @@ async function refreshJob(id){
         <pre>${esc(it.ocr_text||'')}</pre>
       </div>
     </div>`).join('');
-  document.getElementById('items').innerHTML = items || '<div class="muted">Sem itens.</div>';
+  document.getElementById('items').innerHTML = html || '<div class="muted">Sem itens.</div>';
 }
 
 async function delJob(id){
   if(!confirm('Excluir este job?')) return;
   const r = await fetch(`${API}/api/jobs/${id}/`, {method:'DELETE'});
-  if(r.ok){ listJobs(); document.getElementById('jobDetail').style.display='none'; }
+  if(r.ok){ jobWatch++; listJobs(); document.getElementById('jobDetail').style.display='none'; }
+}
+
+document.getElementById('btnRefresh').onclick = () => listJobs();
+document.getElementById('btnMore').onclick = () => listJobs(true);
+
+// Upload direto para o S3: 1) pede URLs pré-assinadas  2) sobe em paralelo  3) finaliza
+const UPLOAD_CONCURRENCY = 6;
+
+async function runPool(tasks, n){
+  let i = 0;
+  const lanes = Array.from({length: Math.min(n, tasks.length)}, async () => {
+    while(i < tasks.length){ const t = tasks[i++]; await t(); }
+  });
+  await Promise.all(lanes);
+}
+
+async function putOrFail(url, body, headers){
+  const r = await fetch(url, {method:'PUT', body, headers: headers || {}});
+  if(!r.ok) throw new Error(`PUT ${r.status}`);
+  return r;
 }
 
-document.getElementById('btnRefresh').onclick = listJobs;
+async function uploadDirect(name, files, onProgress, ocr_language){
+  // o cache de OCR é consultado pelo worker depois de baixar o arquivo
+  const meta = Array.from(files, f => ({name: f.name, content_type: f.type || 'image/jpeg', size: f.size}));
+  const r = await fetch(`${API}/api/jobs/uploads/`, {
+    method:'POST', headers:{'Content-Type':'application/json'},
+    body: JSON.stringify({name, ocr_language, files: meta}),
+  });
+  if(!r.ok) throw new Error('presign falhou');
+  const {job_id, uploads} = await r.json();
+
+  const done = [];
+  const tasks = [];
+  uploads.forEach((u, idx) => {
+    const file = files[idx];
+    if(u.method === 'PUT'){
+      tasks.push(async () => {
+        await putOrFail(u.url, file, u.headers);
+        done.push({item_id: u.item_id, s3_key: u.s3_key});
+        onProgress(done.length, uploads.length);
+      });
+    }else{
+      // multipart: cada parte é uma tarefa; o ETag vem no header da resposta
+      const parts = [];
+      u.parts.forEach(p => tasks.push(async () => {
+        const start = (p.part_number - 1) * u.part_size;
+        const res = await putOrFail(p.url, file.slice(start, start + u.part_size));
+        parts.push({PartNumber: p.part_number, ETag: res.headers.get('ETag')});
+        if(parts.length === u.parts.length){
+          done.push({item_id: u.item_id, s3_key: u.s3_key, upload_id: u.upload_id, parts});
+          onProgress(done.length, uploads.length);
+        }
+      }));
+    }
+  });
+  await runPool(tasks, UPLOAD_CONCURRENCY);
+
+  const fin = await fetch(`${API}/api/jobs/${job_id}/finalize/`, {
+    method:'POST', headers:{'Content-Type':'application/json'},
+    body: JSON.stringify({items: done}),
+  });
+  if(!fin.ok) throw new Error('finalize falhou');
+  return fin.json();
+}
 
 document.getElementById('formUpload').addEventListener('submit', async (ev)=>{
   ev.preventDefault();
-  const fd = new FormData(ev.target);
+  const form = new FormData(ev.target);
+  const name = form.get('name');
   const files = document.getElementById('images').files;
-  for(const f of files) fd.append('images', f, f.name);
-  const r = await fetch(`${API}/api/jobs/`, { method:'POST', body: fd });
   const msg = document.getElementById('uploadMsg');
-  if(r.ok){
-    const j = await r.json();
+  if(!files.length){ msg.textContent = 'Selecione ao menos uma imagem'; return; }
+  try{
+    const j = await uploadDirect(name, files, (n, total) => { msg.textContent = `Enviando ${n}/${total}...`; },
+                                  form.get('ocr_language'));
     msg.textContent = 'Job criado: '+j.id;
     listJobs(); openJob(j.id);
-  }else{
-    msg.textContent = 'Falha no upload';
+  }catch(e){
+    msg.textContent = 'Falha no upload: ' + e.message;
   }
 });
 
@@ -210,9 +210,17 @@ Environment=AWS_SHARED_CREDENTIALS_FILE=/home/ec2-user/.aws/credentials
 Environment=AWS_CONFIG_FILE=/home/ec2-user/.aws/config
 Environment=AWS_PROFILE=default
 
-# Gunicorn no loopback (Nginx faz proxy)
+# Métricas multiprocesso: diretório vazio a cada start (systemd cria em /run
+# e apaga no stop); gunicorn.conf.py tira do /metrics os workers que morrem
+RuntimeDirectory=ocr-backend-metrics
+Environment=PROMETHEUS_MULTIPROC_DIR=/run/ocr-backend-metrics
+
+# Gunicorn no loopback (Nginx faz proxy). gthread: o long-poll de progresso
+# segura uma thread por até PROGRESS_MAX_WAIT s, não o processo inteiro
 ExecStart=/opt/ocr-aws/backend/.venv/bin/gunicorn app.wsgi:application \
-  --bind 127.0.0.1:8000 --workers 2 --access-logfile - --error-logfile -
+  --config /opt/ocr-aws/backend/gunicorn.conf.py \
+  --bind 127.0.0.1:8000 --workers 2 --worker-class gthread --threads 16 \
+  --access-logfile - --error-logfile -
 
 Restart=always
 RestartSec=2
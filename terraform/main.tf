@@ -13,6 +13,37 @@ resource "aws_s3_bucket" "images" {
   }
 }
 
+# cópia durável do cache de OCR (cache/ocr/<sha256>.txt) expira junto com o TTL do banco
+resource "aws_s3_bucket_lifecycle_configuration" "images" {
+  bucket = aws_s3_bucket.images.id
+
+  rule {
+    id     = "ocr-cache-ttl"
+    status = "Enabled"
+
+    filter {
+      prefix = "cache/ocr/"
+    }
+
+    expiration {
+      days = var.ocr_cache_ttl_days
+    }
+  }
+}
+
+# upload direto do navegador (URLs pré-assinadas de PUT / multipart)
+resource "aws_s3_bucket_cors_configuration" "images" {
+  bucket = aws_s3_bucket.images.id
+
+  cors_rule {
+    allowed_methods = ["PUT"]
+    allowed_origins = ["*"]
+    allowed_headers = ["*"]
+    expose_headers  = ["ETag"]
+    max_age_seconds = 3000
+  }
+}
+
 resource "aws_dynamodb_table" "crud_logs" {
   name         = "${local.name}-crud-logs"
   billing_mode = "PAY_PER_REQUEST"
@@ -37,6 +68,17 @@ resource "aws_dynamodb_table" "crud_logs" {
 resource "aws_sqs_queue" "jobs" {
   name                       = "${local.name}-queue"
   message_retention_seconds  = 172800 # 2 dias
+  visibility_timeout_seconds = 60 # base curta; o worker estende via heartbeat (SQS_VISIBILITY_TIMEOUT)
+
+  tags = {
+    Project = local.name
+  }
+}
+
+# lane "interactive": jobs pequenos não esperam atrás dos grandes (SQS_QUEUE_URL_INTERACTIVE)
+resource "aws_sqs_queue" "jobs_interactive" {
+  name                       = "${local.name}-queue-interactive"
+  message_retention_seconds  = 172800 # 2 dias
   visibility_timeout_seconds = 60
 
   tags = {
@@ -1,6 +1,7 @@
 output "s3_bucket"     { value = aws_s3_bucket.images.bucket }
 output "dynamo_table"  { value = aws_dynamodb_table.crud_logs.name }
 output "sqs_queue_url" { value = aws_sqs_queue.jobs.url }
+output "sqs_queue_url_interactive" { value = aws_sqs_queue.jobs_interactive.url }
 
 output "aws_region" {
   value = data.aws_region.current.name
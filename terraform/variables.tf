@@ -36,3 +36,8 @@ variable "db_password" {
   type    = string
   default = "1234_Andrade"
 }
+
+variable "ocr_cache_ttl_days" {
+  type    = number
+  default = 30
+}
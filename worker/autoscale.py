@@ -0,0 +1,274 @@
+"""
+Autoscaling dos workers pela profundidade da fila.
+
+A cada AUTOSCALE_INTERVAL o controlador lê ApproximateNumberOfMessages e
+ApproximateNumberOfMessagesNotVisible do SQS e a vazão medida (itens/s por
+processo de OCR) e calcula quantos processos são necessários para esvaziar
+a fila dentro de AUTOSCALE_SLA_SECONDS, contados de quando a fila começou
+a acumular (a última vez que não havia mensagem visível esperando):
+
+    alvo = ceil((backlog / tempo que resta do SLA + chegadas/s) / vazão por processo)
+
+As chegadas/s saem da vazão total somada à variação do backlog na rodada:
+sem elas, com upload contínuo o backlog parece pequeno e o pool encolhe
+abaixo do necessário.
+
+Sobe na hora; desce um passo por vez e só depois de AUTOSCALE_COOLDOWN sem
+subir (evita oscilar entre dois lotes de upload). O alvo vira o tamanho do
+pool deste host (OcrWorkerPool.resize). Instâncias não são criadas aqui: o
+worker só é instalado por scripts/deploy-worker.sh (SSH), então uma máquina
+nova subiria sem código, .env nem serviço.
+
+Simulação (fila fake, sem AWS), para testar a política offline:
+
+    python autoscale.py --simulate --backlog 2000 --service-seconds 3 --sla 600
+"""
+import argparse, math, os, random, threading, time, traceback
+
+AUTOSCALE_ENABLED = os.getenv("AUTOSCALE_ENABLED", "0") == "1"
+AUTOSCALE_SLA_SECONDS = float(os.getenv("AUTOSCALE_SLA_SECONDS", "300"))    # esvaziar a fila em até
+AUTOSCALE_MIN_PROCESSES = int(os.getenv("AUTOSCALE_MIN_PROCESSES", "1"))
+AUTOSCALE_MAX_PROCESSES = int(os.getenv("AUTOSCALE_MAX_PROCESSES", str(os.cpu_count() or 1)))  # por host
+AUTOSCALE_INTERVAL = float(os.getenv("AUTOSCALE_INTERVAL", "30"))
+AUTOSCALE_COOLDOWN = float(os.getenv("AUTOSCALE_COOLDOWN", "180"))          # espera para descer
+AUTOSCALE_DEFAULT_RATE = float(os.getenv("AUTOSCALE_DEFAULT_RATE", "0.3"))  # itens/s até haver medida
+
+
+class ScalingPolicy:
+    """Quantos processos de OCR o backlog pede, com histerese para descer."""
+
+    def __init__(self, sla_seconds: float = 300, min_workers: int = 1, max_workers: int = 8,
+                 default_rate: float = 0.3, cooldown: float = 180, down_step: int = 1):
+        self.sla_seconds = sla_seconds
+        self.min_workers = max(0, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.default_rate = default_rate
+        self.cooldown = cooldown
+        self.down_step = max(1, down_step)
+        self._last_up = float("-inf")
+        self._waiting_since = None
+
+    def desired(self, visible: int, in_flight: int, rate_per_worker: float = None, now: float = 0.0,
+                arrival_rate: float = 0.0) -> int:
+        # dividir sempre pelo SLA inteiro esvazia a fila só assintoticamente; o prazo corre
+        if not visible:
+            self._waiting_since = None
+        elif self._waiting_since is None:
+            self._waiting_since = now
+        backlog = visible + in_flight
+        if not backlog and not arrival_rate:
+            return self.min_workers
+        left = self.sla_seconds - (now - self._waiting_since if self._waiting_since is not None else 0)
+        left = max(left, self.sla_seconds * 0.1)  # prazo estourado: teto é max_workers
+        rate = rate_per_worker or self.default_rate
+        need = math.ceil((backlog / left + arrival_rate) / rate)
+        return max(self.min_workers, min(self.max_workers, need))
+
+    def decide(self, current: int, desired: int, now: float) -> int:
+        if desired > current:
+            self._last_up = now
+            return desired
+        if desired < current and now - self._last_up >= self.cooldown:
+            return max(desired, current - self.down_step)
+        return current
+
+
+class ThroughputMeter:
+    """Itens/s por processo (média móvel exponencial) medidos enquanto havia fila."""
+
+    def __init__(self, alpha: float = 0.3, clock=time.monotonic):
+        self.alpha = alpha
+        self.clock = clock
+        self.rate = None
+        self.total_rate = 0.0   # itens/s de todos os processos na última janela
+        self.window = 0.0
+        self._count = 0
+        self._t = clock()
+        self._lock = threading.Lock()
+
+    def record(self, n: int = 1):
+        with self._lock:
+            self._count += n
+
+    def sample(self, workers: int, busy: bool) -> float:
+        now = self.clock()
+        with self._lock:
+            n, self._count = self._count, 0
+        dt, self._t = now - self._t, now
+        self.total_rate, self.window = (n / dt if dt > 0 else 0.0), dt
+        # processo ocioso mede falta de trabalho, não vazão; n=0 com OCR longo em voo também não
+        if busy and workers and n and dt > 0:
+            rate = n / dt / workers
+            self.rate = rate if self.rate is None else self.alpha * rate + (1 - self.alpha) * self.rate
+        return self.rate
+
+
+class AutoscaleController:
+    """
+    queue_stats() -> (visíveis, em voo); apply(alvo) aplica e retorna o número
+    efetivo de processos. step() é uma rodada; start() roda em thread.
+    """
+
+    def __init__(self, policy: ScalingPolicy, meter: ThroughputMeter, queue_stats, apply,
+                 current: int, interval: float = 30, clock=time.monotonic):
+        self.policy = policy
+        self.meter = meter
+        self.queue_stats = queue_stats
+        self.apply = apply
+        self.current = current
+        self.interval = interval
+        self.clock = clock
+        self._busy = False
+        self._backlog = None
+        self.arrival_rate = 0.0
+        self._stop = threading.Event()
+
+    def step(self) -> dict:
+        visible, in_flight = self.queue_stats()
+        rate = self.meter.sample(self.current, self._busy)
+        backlog = visible + in_flight
+        if self._backlog is not None and self.meter.window > 0:
+            # chegadas = o que saiu + o que a fila cresceu (média móvel, contadores do SQS oscilam)
+            arrivals = max(0.0, self.meter.total_rate + (backlog - self._backlog) / self.meter.window)
+            self.arrival_rate = 0.5 * arrivals + 0.5 * self.arrival_rate
+        self._backlog = backlog
+        # só há vazão por processo se todos tinham trabalho: com mensagens visíveis esperando
+        self._busy = bool(visible)
+        now = self.clock()
+        desired = self.policy.desired(visible, in_flight, rate, now, self.arrival_rate)
+        target = self.policy.decide(self.current, desired, now)
+        if target != self.current:
+            print(f"[AUTOSCALE] {self.current} -> {target} processos (visible={visible} "
+                  f"in_flight={in_flight} rate={rate or 0:.3f}/s arrivals={self.arrival_rate:.2f}/s "
+                  f"desired={desired})")
+            self.current = self.apply(target)
+        return {"visible": visible, "in_flight": in_flight, "rate": rate, "arrivals": self.arrival_rate,
+                "desired": desired, "current": self.current}
+
+    def start(self):
+        def loop():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.step()
+                except Exception as e:
+                    print(f"[AUTOSCALE] rodada falhou: {e}")
+                    traceback.print_exc()
+
+        threading.Thread(target=loop, name="autoscale", daemon=True).start()
+        print(f"[AUTOSCALE] start sla={self.policy.sla_seconds:.0f}s "
+              f"min={self.policy.min_workers} max={self.policy.max_workers} interval={self.interval:.0f}s")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def sqs_queue_stats(sqs, queue_urls: list):
+    """(visíveis, em voo) somados nas filas de todas as lanes."""
+    def stats():
+        visible = in_flight = 0
+        for url in queue_urls:
+            attrs = sqs.get_queue_attributes(
+                QueueUrl=url,
+                AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+            )["Attributes"]
+            visible += int(attrs.get("ApproximateNumberOfMessages", 0))
+            in_flight += int(attrs.get("ApproximateNumberOfMessagesNotVisible", 0))
+        return visible, in_flight
+    return stats
+
+
+def pool_applier(pool):
+    """apply() do worker: o alvo vira o tamanho do pool deste host."""
+    def apply(target: int) -> int:
+        pool.resize(target)
+        return pool.processes
+
+    return apply
+
+
+# ==============================================================================
+# Simulação: fila e workers fake num relógio simulado
+# ==============================================================================
+class _SimClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def simulate(backlog: int, arrival_rate: float, service_seconds: float, duration: float,
+             policy: ScalingPolicy, interval: float, seed: int = 1, verbose: bool = True) -> dict:
+    rng = random.Random(seed)
+    clock = _SimClock()
+    state = {"visible": backlog, "workers": max(1, policy.min_workers)}
+    running = []  # fim do OCR de cada item em processamento
+    meter = ThroughputMeter(clock=clock)
+
+    def stats():
+        return state["visible"], len(running)
+
+    def apply(target):
+        # processos a mais terminam o item atual antes de sair (igual ao pool)
+        state["workers"] = max(1, target)
+        return state["workers"]
+
+    ctl = AutoscaleController(policy, meter, stats, apply, state["workers"], interval, clock)
+    next_arrival = rng.expovariate(arrival_rate) if arrival_rate > 0 else float("inf")
+    done, worker_seconds, peak, drained_at, next_step, dt = 0, 0.0, 0, None, 0.0, 0.5
+    while clock.t < duration:
+        while next_arrival <= clock.t:
+            state["visible"] += 1
+            next_arrival += rng.expovariate(arrival_rate)
+        finished = [end for end in running if end <= clock.t]
+        if finished:
+            running = [end for end in running if end > clock.t]
+            done += len(finished)
+            meter.record(len(finished))
+        while len(running) < state["workers"] and state["visible"]:
+            state["visible"] -= 1
+            running.append(clock.t + rng.expovariate(1 / service_seconds))
+        n = max(state["workers"], len(running))
+        worker_seconds += n * dt
+        peak = max(peak, n)
+        if drained_at is None and not state["visible"] and not running:
+            drained_at = clock.t
+        if clock.t >= next_step:
+            s = ctl.step()
+            next_step += interval
+            if verbose:
+                print(f"t={clock.t:7.0f}s visible={s['visible']:6d} in_flight={s['in_flight']:4d} "
+                      f"rate={s['rate'] or 0:.3f}/s arrivals={s['arrivals']:.2f}/s desired={s['desired']:3d} workers={s['current']:3d}")
+        clock.t += dt
+    return {"processed": done, "left": state["visible"] + len(running), "drained_at_s": drained_at,
+            "peak_workers": peak, "worker_seconds": round(worker_seconds), "sla_s": policy.sla_seconds,
+            "sla_met": drained_at is not None and drained_at <= policy.sla_seconds,
+            "single_worker_estimate_s": round(backlog * service_seconds)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--simulate", action="store_true", help="roda a política contra uma fila fake")
+    ap.add_argument("--backlog", type=int, default=1000, help="mensagens na fila em t=0")
+    ap.add_argument("--arrival-rate", type=float, default=0.0, help="chegadas/s depois de t=0")
+    ap.add_argument("--service-seconds", type=float, default=3.0, help="OCR médio por item")
+    ap.add_argument("--duration", type=float, default=3600)
+    ap.add_argument("--sla", type=float, default=AUTOSCALE_SLA_SECONDS)
+    ap.add_argument("--min", type=int, default=AUTOSCALE_MIN_PROCESSES)
+    ap.add_argument("--max", type=int, default=AUTOSCALE_MAX_PROCESSES)
+    ap.add_argument("--interval", type=float, default=AUTOSCALE_INTERVAL)
+    ap.add_argument("--cooldown", type=float, default=AUTOSCALE_COOLDOWN)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    if not args.simulate:
+        ap.error("no worker o controlador sobe com AUTOSCALE_ENABLED=1 (main.py); aqui só --simulate")
+
+    policy = ScalingPolicy(args.sla, args.min, args.max, AUTOSCALE_DEFAULT_RATE, args.cooldown)
+    result = simulate(args.backlog, args.arrival_rate, args.service_seconds, args.duration,
+                      policy, args.interval, args.seed)
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
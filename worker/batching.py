@@ -0,0 +1,50 @@
+"""
+Utilitários do OCR em lote: decodifica bytes em arrays e monta grupos de
+imagens com tamanho parecido, completando com branco até um tamanho comum
+(o detector do EasyOCR só aceita lotes de imagens do mesmo tamanho).
+"""
+import numpy as np
+import cv2
+
+
+def decode_image(raw: bytes) -> np.ndarray:
+    img = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("imagem inválida (cv2.imdecode falhou)")
+    return img
+
+
+def group_by_size(shapes: list, max_pad: float = 1.5) -> list:
+    """
+    Agrupa índices de imagens (shapes = [(h, w), ...]) de forma que a área
+    com padding de cada grupo não passe de max_pad x a soma das áreas reais.
+    """
+    order = sorted(range(len(shapes)), key=lambda i: (shapes[i][0], shapes[i][1]))
+    groups, cur = [], []
+    cur_h = cur_w = cur_area = 0
+    for i in order:
+        h, w = shapes[i]
+        nh, nw, na = max(cur_h, h), max(cur_w, w), cur_area + h * w
+        if cur and nh * nw * (len(cur) + 1) > max_pad * na:
+            groups.append(cur)
+            cur, nh, nw, na = [], h, w, h * w
+        cur.append(i)
+        cur_h, cur_w, cur_area = nh, nw, na
+    if cur:
+        groups.append(cur)
+    return groups
+
+
+def pad_to_common(imgs: list) -> list:
+    """Completa com branco (à direita e embaixo) até o maior h/w do grupo."""
+    h = max(im.shape[0] for im in imgs)
+    w = max(im.shape[1] for im in imgs)
+    out = []
+    for im in imgs:
+        if im.shape[0] == h and im.shape[1] == w:
+            out.append(im)
+            continue
+        canvas = np.full((h, w) + im.shape[2:], 255, dtype=im.dtype)
+        canvas[:im.shape[0], :im.shape[1]] = im
+        out.append(canvas)
+    return out
@@ -0,0 +1,60 @@
+"""
+Buffer de group commit: junta entradas e entrega em grupo.
+
+O worker grava os resultados (DONE/ERROR) de vários itens numa transação só
+e confirma as mensagens no SQS com delete_message_batch em vez de uma
+chamada por item. O buffer entrega o grupo a flush_fn quando chega a
+max_items ou quando a entrada mais antiga já esperou max_wait segundos (uma
+thread própria cuida do prazo, inclusive enquanto o loop está no long poll).
+"""
+import threading, time, traceback
+
+
+class GroupBuffer:
+    def __init__(self, flush_fn, max_items: int, max_wait: float, name: str = "group-buffer"):
+        # flush_fn(lista de entradas) roda fora do lock; um flush por vez
+        self.flush_fn = flush_fn
+        self.max_items = max(1, max_items)
+        self.max_wait = max_wait
+        self.name = name
+        self._items = []
+        self._since = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._loop, name=self.name, daemon=True).start()
+        return self
+
+    def add(self, entry):
+        with self._lock:
+            if not self._items:
+                self._since = time.monotonic()
+            self._items.append(entry)
+            full = len(self._items) >= self.max_items
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                items, self._items, self._since = self._items, [], None
+            if items:
+                self.flush_fn(items)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def _loop(self):
+        tick = min(0.05, self.max_wait / 2) if self.max_wait > 0 else 0.05
+        while True:
+            time.sleep(tick)
+            with self._lock:
+                due = self._since is not None and time.monotonic() - self._since >= self.max_wait
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"[{self.name}] flush falhou: {type(e).__name__}: {e}")
+                    traceback.print_exc()
@@ -0,0 +1,144 @@
+"""
+Motores de OCR plugáveis e pool de modelos carregados.
+
+Cada job escolhe motor e idioma (Job.ocr_engine / Job.ocr_language, que
+vão na mensagem do SQS). O worker carrega o modelo só quando a primeira
+mensagem daquele (motor, idioma) chega e mantém os modelos num LRU
+limitado por memória (OCR_MODEL_CACHE_MB): um worker que só recebe jobs
+em inglês nunca carrega outro modelo.
+
+Idiomas: códigos ISO 639-1 ("en", "pt"); vários com "+" ("en+pt").
+"""
+import gc, os, time
+from collections import OrderedDict
+import numpy as np
+
+
+def _rss_bytes() -> int:
+    # memória residente atual do processo (Linux); 0 quando não dá para medir
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+class OcrEngine:
+    """Interface: load() uma vez, depois readtext/readtext_batched (listas de strings)."""
+    name = ""
+    batch_same_size = False  # True: readtext_batched exige imagens do mesmo tamanho (padding)
+
+    def __init__(self, lang: str):
+        self.lang = lang
+        self.langs = lang.split("+")
+
+    def load(self):
+        raise NotImplementedError
+
+    def readtext(self, img: np.ndarray) -> list:
+        raise NotImplementedError
+
+    def readtext_batched(self, imgs: list, batch_size: int = 16) -> list:
+        # padrão: uma imagem por vez (motores sem lote nativo)
+        return [self.readtext(img) for img in imgs]
+
+
+class EasyOcrEngine(OcrEngine):
+    name = "easyocr"
+    batch_same_size = True
+
+    def load(self):
+        import easyocr  # importa aqui: torch só entra no processo quando precisa
+        # CPU (gpu=False); modelos de detecção/reconhecimento do(s) idioma(s)
+        self.reader = easyocr.Reader(self.langs, gpu=False)
+
+    def readtext(self, img):
+        # detail=0 (só o texto) e paragraph=True (tenta juntar linhas)
+        return self.reader.readtext(img, detail=0, paragraph=True)
+
+    def readtext_batched(self, imgs, batch_size=16):
+        return self.reader.readtext_batched(imgs, batch_size=batch_size, detail=0, paragraph=True)
+
+
+# tesseract usa ISO 639-2 ("eng", "por")
+_TESSERACT_LANGS = {"en": "eng", "pt": "por", "es": "spa", "fr": "fra", "de": "deu", "it": "ita"}
+
+
+class TesseractEngine(OcrEngine):
+    """Tesseract via pytesseract (opcional: pip install pytesseract + binário tesseract)."""
+    name = "tesseract"
+
+    def load(self):
+        import pytesseract
+        self._tess = pytesseract
+        self._lang = "+".join(_TESSERACT_LANGS.get(l, l) for l in self.langs)
+        self._tess.get_tesseract_version()  # falha cedo se o binário não existir
+
+    def readtext(self, img):
+        if img.ndim == 3:
+            img = np.ascontiguousarray(img[:, :, ::-1])  # BGR (OpenCV) -> RGB
+        text = self._tess.image_to_string(img, lang=self._lang).strip()
+        return [text] if text else []
+
+
+ENGINES = {cls.name: cls for cls in (EasyOcrEngine, TesseractEngine)}
+
+
+class EnginePool:
+    """
+    LRU de motores carregados, chave (motor, idioma). O custo de cada modelo
+    é medido pela variação de RSS ao carregar; acima de max_mb os menos
+    usados são descartados (o mais recente fica sempre).
+    """
+
+    def __init__(self, max_mb: int = 2048, warmup: bool = True):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.warmup = warmup
+        self._engines = OrderedDict()   # (engine, lang) -> OcrEngine
+        self.stats = {}                 # (engine, lang) -> {"load_ms", "warmup_ms", "mb"}
+
+    def get(self, engine: str, lang: str) -> OcrEngine:
+        key = (engine, lang)
+        eng = self._engines.get(key)
+        if eng is not None:
+            self._engines.move_to_end(key)
+            return eng
+        if engine not in ENGINES:
+            raise ValueError(f"motor de OCR desconhecido: {engine}")
+
+        print(f"[ENGINE] carregando {engine}:{lang} pid={os.getpid()} (isso pode levar um tempo)...")
+        rss0 = _rss_bytes()
+        t = time.perf_counter()
+        eng = ENGINES[engine](lang)
+        eng.load()
+        load_ms = (time.perf_counter() - t) * 1000
+
+        warmup_ms = 0.0
+        if self.warmup:
+            # 1ª inferência paga inicializações preguiçosas (kernels, alocações)
+            t = time.perf_counter()
+            eng.readtext(np.full((64, 256), 255, dtype=np.uint8))
+            warmup_ms = (time.perf_counter() - t) * 1000
+        size = max(0, _rss_bytes() - rss0)
+        eng.mem_bytes = size
+
+        self._engines[key] = eng
+        self.stats[key] = {"load_ms": round(load_ms, 1), "warmup_ms": round(warmup_ms, 1),
+                           "mb": round(size / 1024 / 1024, 1)}
+        print(f"[ENGINE] pronto {engine}:{lang} load_ms={load_ms:.0f} warmup_ms={warmup_ms:.0f} "
+              f"rss+={size / 1024 / 1024:.0f}MB")
+        self._evict()
+        return eng
+
+    def _evict(self):
+        while len(self._engines) > 1 and self.total_bytes() > self.max_bytes:
+            (engine, lang), eng = self._engines.popitem(last=False)
+            print(f"[ENGINE] descartando {engine}:{lang} ({eng.mem_bytes / 1024 / 1024:.0f}MB, LRU)")
+            del eng
+            gc.collect()
+
+    def total_bytes(self) -> int:
+        return sum(e.mem_bytes for e in self._engines.values())
+
+    def loaded(self) -> list:
+        return list(self._engines)
@@ -0,0 +1,96 @@
+"""
+Heartbeat de visibilidade do SQS.
+
+Enquanto uma mensagem está em voo (pré-buscada ou em OCR) uma thread estende
+o visibility timeout dela com change_message_visibility_batch. Assim o timeout
+base pode ficar curto (60s) sem que uma página grande volte para a fila e seja
+processada duas vezes por outro worker.
+"""
+import time, threading, traceback
+
+
+class VisibilityHeartbeat:
+    def __init__(self, sqs, queue_url: str, visibility_timeout: int = 60,
+                 interval: float = None, max_seconds: int = 6 * 3600):
+        self.sqs = sqs
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        # estende com folga: a cada 1/3 do timeout
+        self.interval = interval or max(1.0, visibility_timeout / 3.0)
+        # limite de segurança: uma mensagem "presa" não segura a fila para sempre
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._msgs = {}  # msg_id -> (receipt_handle, received_at, queue_url)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="sqs-heartbeat", daemon=True)
+        self._thread.start()
+        print(f"[HEARTBEAT] start visibility={self.visibility_timeout}s interval={self.interval:.0f}s")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def track(self, msg: dict):
+        with self._lock:
+            # com lanes (ver lanes.py) cada mensagem diz de qual fila veio
+            self._msgs[msg["MessageId"]] = (msg["ReceiptHandle"], time.time(),
+                                            msg.get("QueueUrl") or self.queue_url)
+
+    def untrack(self, msg: dict):
+        with self._lock:
+            self._msgs.pop(msg["MessageId"], None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._msgs)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                print(f"[HEARTBEAT] falhou: {e}")
+                traceback.print_exc()
+
+    def beat(self):
+        now = time.time()
+        with self._lock:
+            expired = [mid for mid, (_, t0, _) in self._msgs.items() if now - t0 > self.max_seconds]
+            for mid in expired:
+                self._msgs.pop(mid, None)
+            by_queue = {}
+            for mid, (rh, _, url) in self._msgs.items():
+                by_queue.setdefault(url, []).append((mid, rh))
+        for mid in expired:
+            print(f"[HEARTBEAT] desistindo de estender msg={mid} (> {self.max_seconds}s)")
+        if not by_queue:
+            return
+
+        # change_message_visibility_batch aceita no máximo 10 entradas (de uma fila)
+        chunks = [(url, pending[i:i + 10]) for url, pending in by_queue.items()
+                  for i in range(0, len(pending), 10)]
+        extended = 0
+        for url, chunk in chunks:
+            # uma fila/lote com erro não impede estender os outros
+            try:
+                resp = self.sqs.change_message_visibility_batch(
+                    QueueUrl=url,
+                    Entries=[
+                        {"Id": str(n), "ReceiptHandle": rh, "VisibilityTimeout": self.visibility_timeout}
+                        for n, (_, rh) in enumerate(chunk)
+                    ],
+                )
+            except Exception as e:
+                print(f"[HEARTBEAT] falhou ao estender {len(chunk)} msgs de {url}: {e}")
+                continue
+            extended += len(chunk) - len(resp.get("Failed", []))
+            for f in resp.get("Failed", []):
+                mid = chunk[int(f["Id"])][0]
+                # receipt inválido/expirado: a mensagem já foi entregue a outro consumidor
+                print(f"[HEARTBEAT] falha ao estender msg={mid}: {f.get('Code')} {f.get('Message')}")
+                with self._lock:
+                    self._msgs.pop(mid, None)
+        print(f"[HEARTBEAT] estendido {extended} msgs por +{self.visibility_timeout}s")
@@ -0,0 +1,89 @@
+"""
+Poller justo entre as filas (lanes) do SQS.
+
+Jobs pequenos vão para a fila "interactive" e jobs grandes para a "bulk"
+(ver views._lane_for). Um receive só enxerga uma fila, então o poller
+decide a cada chamada de qual fila buscar: deficit round robin ponderado
+por mensagem recebida (SQS_LANE_WEIGHTS, ex. "interactive:4,bulk:1"). Com as
+duas cheias a interactive leva ~4/5 das mensagens; fila vazia cede a vez
+(a bulk usa o worker inteiro quando não há job pequeno) e não acumula
+crédito enquanto está vazia.
+
+Cada mensagem recebida ganha "QueueUrl" e "Lane": o ack, o heartbeat e as
+métricas usam a fila de onde ela veio.
+"""
+
+
+def parse_weights(spec: str) -> dict:
+    weights = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, w = part.partition(":")
+        weights[name.strip()] = max(1, int(w or 1))
+    return weights
+
+
+def configured_lanes(settings) -> list:
+    """[(lane, queue_url, peso)] a partir do settings; uma fila só quando não há interactive."""
+    if not settings.SQS_QUEUE_URL_INTERACTIVE:
+        return [("bulk", settings.SQS_QUEUE_URL, 1)]
+    weights = parse_weights(settings.SQS_LANE_WEIGHTS)
+    return [("interactive", settings.SQS_QUEUE_URL_INTERACTIVE, weights.get("interactive", 1)),
+            ("bulk", settings.SQS_QUEUE_URL, weights.get("bulk", 1))]
+
+
+class LanePoller:
+    def __init__(self, sqs, lanes: list, visibility_timeout: int, wait_seconds: int = 20,
+                 idle_wait: int = 2):
+        self.sqs = sqs
+        self.lanes = lanes
+        self.visibility_timeout = visibility_timeout
+        # uma fila: long polling normal; várias: varre sem esperar e só então faz um
+        # long poll curto na de maior peso (as outras não ficam esperando 20s)
+        self.wait_seconds = wait_seconds if len(lanes) == 1 else idle_wait
+        self._credit = {name: 0.0 for name, _, _ in lanes}
+        self._total = sum(w for _, _, w in lanes)
+        self.received = {name: 0 for name, _, _ in lanes}
+
+    @property
+    def queue_urls(self) -> list:
+        return [url for _, url, _ in self.lanes]
+
+    def _order(self) -> list:
+        for name, _, w in self.lanes:
+            self._credit[name] += w
+        return sorted(self.lanes, key=lambda lane: -self._credit[lane[0]])
+
+    def _receive(self, url: str, n: int, wait: int) -> list:
+        resp = self.sqs.receive_message(
+            QueueUrl=url,
+            MaxNumberOfMessages=min(10, n),
+            WaitTimeSeconds=wait,
+            VisibilityTimeout=self.visibility_timeout,
+            AttributeNames=["SentTimestamp"],
+        )
+        return resp.get("Messages", [])
+
+    def receive(self, n: int, wait: int = None) -> list:
+        """Até n (<= 10) mensagens de uma lane; [] depois de esperar até wait (padrão wait_seconds)."""
+        n = min(10, n)
+        wait = self.wait_seconds if wait is None else wait
+        if len(self.lanes) == 1:
+            name, url, _ = self.lanes[0]
+            return self._tag(self._receive(url, n, wait), name, url)
+
+        for name, url, _ in self._order():
+            msgs = self._receive(url, n, 0)
+            if msgs:
+                # cobra o que recebeu: lotes parciais custam proporcionalmente menos
+                self._credit[name] -= self._total * len(msgs) / n
+                return self._tag(msgs, name, url)
+            self._credit[name] = 0.0  # vazia: não guarda crédito para depois
+        name, url, _ = max(self.lanes, key=lambda lane: lane[2])
+        return self._tag(self._receive(url, n, wait), name, url) if wait else []
+
+    def _tag(self, msgs: list, name: str, url: str) -> list:
+        for m in msgs:
+            m["QueueUrl"], m["Lane"] = url, name
+        self.received[name] += len(msgs)
+        return msgs
+
@@ -1,11 +1,7 @@
-import io
-import os, sys, json, time, traceback
+import io, hashlib
+import os, sys, json, time, signal, traceback
 from dotenv import load_dotenv
 
-# --- MUDANÇA: Não precisamos mais de PIL ou Numpy aqui ---
-# from PIL import Image
-# import numpy as np
-
 # carrega .env do worker
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(BASE_DIR, ".env"))
@@ -15,142 +11,752 @@ BACKEND_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "backend"))
 if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
+# métricas: o pool grava as de todos os processos num diretório comum (ver app/jobs/metrics.py)
+os.environ.setdefault("METRICS_COMPONENT", "worker")
+_POOLED = int(os.getenv("WORKER_PROCESSES", "1")) > 1 or os.getenv("AUTOSCALE_ENABLED", "0") == "1"
+if _POOLED and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    import tempfile
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="ocr-metrics-")
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 import django
 django.setup()
 
-# ==============================================================================
-# MUDANÇA: Imports e ENVs
-# ==============================================================================
-# 1. Importa o EasyOCR
-import easyocr
-
-# 2. Removemos as ENVs do Paddle (PDX_HOME, etc.)
-
 import boto3
 from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
+from django.db.models import Case, F, Value, When
 from app.jobs.models import Job, JobItem
+from app.jobs import ocr_cache
+from app.jobs.aws_clients import log_ddb, audit_log, upload_s3_many, enqueue_items, queue_url_for
+from app.jobs import metrics
+from app.jobs.metrics import span
 
 session = boto3.session.Session(region_name=settings.AWS_REGION)
 s3 = session.client("s3")
 sqs = session.client("sqs")
 
 # ==============================================================================
-# MUDANÇA: Inicializa o EasyOCR (globalmente, UMA VEZ)
+# Motores de OCR (ver engines.py): carregados sob demanda por (motor, idioma),
+# UMA VEZ por processo. No modo pool (WORKER_PROCESSES > 1) cada processo de
+# OCR tem o seu EnginePool.
 # ==============================================================================
-print("[WORKER] Inicializando EasyOCR (isso pode levar um tempo)...")
-# Forçamos CPU (gpu=False) e carregamos o modelo de inglês ('en')
-_EASYOCR_MODEL = easyocr.Reader(['en'], gpu=False)
-print("[WORKER] EasyOCR pronto.")
+OCR_MODEL_CACHE_MB = int(os.getenv("OCR_MODEL_CACHE_MB", "2048"))  # LRU de modelos carregados
+OCR_WARMUP = os.getenv("OCR_WARMUP", "1") == "1"                   # inferência de aquecimento ao carregar
+# carregados na subida (ex.: "easyocr:en,easyocr:pt"); vazio = só sob demanda
+OCR_PRELOAD = os.getenv("OCR_PRELOAD", f"{settings.OCR_DEFAULT_ENGINE}:{settings.OCR_DEFAULT_LANGUAGE}")
+_ENGINE_POOL = None
+
+
+def get_engine(engine: str = None, lang: str = None):
+    """Motor de OCR (engine, lang) deste processo; carrega na 1a chamada."""
+    global _ENGINE_POOL
+    if _ENGINE_POOL is None:
+        from engines import EnginePool
+        _ENGINE_POOL = EnginePool(OCR_MODEL_CACHE_MB, warmup=OCR_WARMUP)
+    return _ENGINE_POOL.get(engine or settings.OCR_DEFAULT_ENGINE, lang or settings.OCR_DEFAULT_LANGUAGE)
 
 
-def get_easyocr_model():
-    """Retorna a instância global e pré-inicializada do EasyOCR."""
-    global _EASYOCR_MODEL
-    return _EASYOCR_MODEL
+def preload_engines():
+    for spec in filter(None, (s.strip() for s in OCR_PRELOAD.split(","))):
+        engine, _, lang = spec.partition(":")
+        get_engine(engine, lang or None)
 
 # ==============================================================================
-# MUDANÇA: Função mock_ocr() agora usa EasyOCR
+# Pré-processamento (EXIF, cinza, redução, tiles) antes do EasyOCR
 # ==============================================================================
-def mock_ocr(bytes_data: bytes) -> str:
+PREPROC_ENABLED = os.getenv("PREPROC_ENABLED", "1") == "1"
+
+
+def prepare_images(bytes_data: bytes) -> list:
+    """bytes -> lista de arrays para o OCR (mais de um quando o scan vira tiles)."""
+    if not PREPROC_ENABLED:
+        from batching import decode_image
+        return [decode_image(bytes_data)]
+    from preprocess import preprocess
+    arrays, timings = preprocess(bytes_data)
+    steps = " ".join(f"{k}={v:.1f}" if k.endswith("_ms") else f"{k}={v}" for k, v in timings.items())
+    print(f"[PREPROC] {steps} shape={arrays[0].shape[:2]}")
+    return arrays
+
+
+def ocr_image(bytes_data: bytes, engine) -> str:
     """
-    Roda o EasyOCR diretamente nos bytes da imagem.
-    Sem resize, sem PIL, sem Numpy. Mais rápido e mais limpo.
+    Roda o motor na imagem pré-processada (ver preprocess.py). Tiles de
+    um scan grande são lidos em ordem e o texto é concatenado.
     """
-    ocr = get_easyocr_model() 
-    
-    print(f"[INFO] Processando imagem com EasyOCR...")
-
-    # EasyOCR pode ler os bytes puros diretamente
-    # detail=0 (só o texto) e paragraph=True (tenta juntar linhas)
-    result = ocr.readtext(bytes_data, detail=0, paragraph=True)
-    
-    # O resultado já é uma lista de strings. Juntamos com espaço.
+    print(f"[INFO] Processando imagem com {engine.name}:{engine.lang}...")
+    result = []
+    for img in prepare_images(bytes_data):
+        result.extend(engine.readtext(img))
     return " ".join(result).strip()
+
+
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "1"))              # msgs por passada de OCR
+OCR_RECOG_BATCH_SIZE = int(os.getenv("OCR_RECOG_BATCH_SIZE", "16")) # batch_size do reconhecedor
+OCR_BATCH_MAX_PAD = float(os.getenv("OCR_BATCH_MAX_PAD", "1.5"))    # área com padding / área real
+
+
+def ocr_batch(raws: list, engine) -> list:
+    """
+    OCR de várias imagens numa passada (readtext_batched). O detector do
+    EasyOCR exige imagens do mesmo tamanho: agrupamos por tamanho parecido
+    e completamos com branco (sem redimensionar, não distorce o texto).
+    """
+    from batching import group_by_size, pad_to_common
+
+    imgs, owner = [], []  # owner[i] = índice do raw de onde veio a imagem/tile i
+    for n, raw in enumerate(raws):
+        for img in prepare_images(raw):
+            imgs.append(img)
+            owner.append(n)
+    parts = [None] * len(imgs)
+    if engine.batch_same_size:
+        groups = group_by_size([im.shape[:2] for im in imgs], OCR_BATCH_MAX_PAD)
+    else:
+        groups = [list(range(len(imgs)))]
+    for group in groups:
+        batch = [imgs[i] for i in group]
+        if engine.batch_same_size:
+            batch = pad_to_common(batch)
+        print(f"[INFO] {engine.name} batch n={len(group)} shape={batch[0].shape[:2]}")
+        results = engine.readtext_batched(batch, batch_size=OCR_RECOG_BATCH_SIZE)
+        for i, result in zip(group, results):
+            parts[i] = result
+    out = [[] for _ in raws]
+    for i, result in enumerate(parts):
+        out[owner[i]].extend(result)
+    return [" ".join(r).strip() for r in out]
 # ==============================================================================
 
 
-def set_job_status_if_complete(job: Job):
-    # se todos itens do job estiverem DONE, marca o job como DONE
-    total = job.items.count()
-    done = job.items.filter(status="DONE").count()
-    if total > 0 and done == total and job.status != "DONE":
-        job.status = "DONE"
-        job.save(update_fields=["status"])
-        print(f"[JOB_DONE] job={job.id} total={total}")
+def bump_job_done(job_id, n: int = 1):
+    """
+    Soma n itens concluídos ao job e, no MESMO UPDATE, marca DONE quando
+    done_items alcança total_items (o CASE enxerga os valores antigos).
+    Sem COUNT nem lock de linha do job segurado durante o OCR.
+    """
+    with span("completion_check"):
+        _bump_job_done(job_id, n)
 
-def process_message(msg):
+def _bump_job_done(job_id, n):
+    # job excluído (DELETING) não volta para DONE
+    Job.objects.filter(id=job_id).exclude(status="DELETING").update(
+        done_items=F("done_items") + n,
+        status=Case(
+            When(done_items__gte=F("total_items") - n, then=Value("DONE")),
+            default=F("status"),
+        ),
+    )
+
+# PROCESSING é só informativo (o lease de verdade é o visibility timeout do SQS, estendido
+# pelo heartbeat); com 0 o worker só confere se o item ainda precisa de OCR (um SELECT)
+WORKER_MARK_PROCESSING = os.getenv("WORKER_MARK_PROCESSING", "1") == "1"
+
+# estados "em aberto": página só conta no documento quando sai de um deles
+# (a que deu ERROR já foi contada; reentregue, não pode contar de novo)
+OPEN_STATUSES = ("PENDING", "PROCESSING")
+
+def _claim(item_ids: list) -> set:
+    """
+    Ids (str) dos itens que ainda precisam de OCR, marcando PROCESSING num
+    UPDATE só para o lote. Fora: item já DONE (mensagem reentregue), página
+    em ERROR (já contada no documento), expirado, apagado ou de job em
+    exclusão (DELETING).
+    """
+    live = JobItem.objects.filter(id__in=item_ids).exclude(status__in=["DONE", "EXPIRED"]).exclude(
+        status="ERROR", parent__isnull=False).exclude(job__status="DELETING")
+    with span("db_status"):
+        if not WORKER_MARK_PROCESSING:
+            return {str(i) for i in live.values_list("id", flat=True)}
+        updated = live.update(status="PROCESSING", updated_at=timezone.now())
+        if updated == len(set(item_ids)):
+            return set(item_ids)
+        # algum ficou de fora: os do lote que estão PROCESSING agora são os que seguem
+        return {str(i) for i in JobItem.objects.filter(id__in=item_ids, status="PROCESSING").exclude(
+            job__status="DELETING").values_list("id", flat=True)}
+
+def _begin(msg, live: set = None):
+    """
+    Marca PROCESSING (ou confere em `live`, já reivindicados pelo lote), baixa
+    do S3 e consulta o cache. None = nada a fazer (ack sem processar).
+    """
     body = json.loads(msg["Body"])
     job_id = body["job_id"]
     item_id = body["item_id"]
     bucket = body["s3_bucket"]
     key = body["s3_key"]
+    # mensagens antigas (sem os campos) usam o padrão
+    engine = body.get("ocr_engine") or settings.OCR_DEFAULT_ENGINE
+    lang = body.get("ocr_language") or settings.OCR_DEFAULT_LANGUAGE
 
     print(f"[RECV] job={job_id} item={item_id} key={key}")
 
+    # marca PROCESSING antes de baixar: item já DONE = mensagem reentregue; item apagado,
+    # expirado ou job em exclusão (DELETING) = mensagem órfã. Nos dois casos não baixa nada.
+    if live is None:
+        live = _claim([item_id])
+    if item_id not in live:
+        print(f"[SKIP] item já DONE, expirado, apagado ou job em exclusão: {item_id}")
+        return None
+
     # baixa bytes do S3
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    raw = obj["Body"].read()
+    with span("s3_download"):
+        obj = s3.get_object(Bucket=bucket, Key=key)
+        raw = obj["Body"].read()
 
-    # marca PROCESSING (idempotente)
-    try:
-        with transaction.atomic():
-            it = JobItem.objects.select_for_update().get(id=item_id)
-            it.status = "PROCESSING"
-            it.save(update_fields=["status"])
-    except JobItem.DoesNotExist:
-        print(f"[WARN] item não encontrado no DB: {item_id}")
+    # cache por conteúdo: o mesmo arquivo já processado em outro job
+    sha = hashlib.sha256(raw).hexdigest()
+    with span("cache_lookup"):
+        text = ocr_cache.lookup(sha, engine, lang)
+    if text is not None:
+        print(f"[CACHE_HIT] item={item_id} sha256={sha[:12]}...")
+    return {"msg": msg, "job_id": job_id, "item_id": item_id, "raw": raw,
+            "sha": sha, "text": text, "cached": text is not None, "engine": engine, "lang": lang,
+            "bucket": bucket, "key": key, "stage": body.get("stage", "ocr"),
+            "parent_id": body.get("parent_id"), "doc_sha": body.get("doc_sha256"),
+            "created_at": body.get("created_at"),
+            "lane": body.get("lane", "bulk")}
+
+def _set_text(ctx, text: str):
+    ctx["text"] = text
+    ocr_cache.store(ctx["sha"], text, ctx["engine"], ctx["lang"])
+
+def _mark_done(ctx):
+    job_id, item_id, text = ctx["job_id"], ctx["item_id"], ctx["text"]
+    with transaction.atomic():
+        # só conta no job se ESTE update levou o item a DONE (idempotente); página só
+        # a partir de um estado em aberto (ERROR já contou no documento)
+        items = JobItem.objects.filter(id=item_id)
+        items = items.filter(status__in=OPEN_STATUSES) if ctx.get("parent_id") else items.exclude(status="DONE")
+        with span("db_status"):
+            updated = items.update(ocr_text=text, status="DONE", updated_at=timezone.now())
+        if updated and ctx.get("parent_id"):
+            _bump_document(ctx)  # página: conta no documento, não no job
+        elif updated:
+            bump_job_done(job_id)
+    metrics.count_item("cached" if ctx["cached"] else "done")
+    log_ddb(actor="worker", action="ITEM_DONE", pk=str(job_id), payload={
+        "item_id": str(item_id), "cached": ctx["cached"], "chars": len(text)})
+    print(f"[DONE] job={job_id} item={item_id} text='{text[:60]}'")
+
+def _mark_error(ctx, e: Exception):
+    job_id, item_id = ctx["job_id"], ctx["item_id"]
+    err = f"{type(e).__name__}: {e}"
+    with transaction.atomic():
+        with span("db_status"):
+            updated = JobItem.objects.filter(id=item_id, status__in=OPEN_STATUSES).update(
+                error_msg=err, status="ERROR", updated_at=timezone.now())
+        if updated and ctx.get("parent_id"):
+            _bump_document(ctx)  # página com erro não trava o documento
+    metrics.count_item("error")
+    log_ddb(actor="worker", action="ITEM_ERROR", pk=str(job_id), payload={
+        "item_id": str(item_id), "error": err})
+    print(f"[ERROR] job={job_id} item={item_id} {err}")
+    traceback.print_exc()
+
+# ==============================================================================
+# Documentos de várias páginas (PDF/TIFF): a mensagem "split" vira uma
+# mensagem por página, processadas em paralelo por toda a frota; a última
+# página a terminar junta os textos no item do documento.
+# ==============================================================================
+SPLIT_UPLOAD_CHUNK = int(os.getenv("SPLIT_UPLOAD_CHUNK", "20"))  # páginas por rodada de upload/enqueue
+
+
+def handle_split(ctx) -> bool:
+    """
+    Divide o documento em páginas. True = páginas enfileiradas (nada mais a
+    fazer nesta mensagem); False = uma página só, ctx["raw"] passa a ser a
+    página renderizada e segue o OCR normal.
+    """
+    from splitter import doc_kind, count_pages, iter_pages
+
+    kind = doc_kind(ctx["key"])
+    if kind is None:
+        return False
+    with span("split"):
+        n = count_pages(ctx["raw"], kind)
+        if n <= 1:
+            ctx["raw"] = next(iter_pages(ctx["raw"], kind))[1]
+            return False
+
+        parent_id, job_id = ctx["item_id"], ctx["job_id"]
+        # mensagem reentregue: refaz as páginas (as mensagens das antigas viram no-op)
+        JobItem.objects.filter(parent_id=parent_id).delete()
+        # o hash do documento é o do objeto baixado (_begin), não o que o cliente informou
+        JobItem.objects.filter(id=parent_id).update(pages_total=n, pages_done=0, content_sha256=ctx["sha"],
+                                                    updated_at=timezone.now())
+
+        # documento grande vira trabalho de lote: as páginas não disputam a fila interactive
+        if n > settings.LANE_INTERACTIVE_MAX_ITEMS:
+            ctx["lane"] = "bulk"
+        base = ctx["key"].rsplit("/", 1)[0]
+        chunk = []
+        for page_no, png in iter_pages(ctx["raw"], kind):
+            chunk.append((page_no, png))
+            if len(chunk) >= SPLIT_UPLOAD_CHUNK:
+                _enqueue_pages(ctx, f"{base}/{parent_id}", chunk)
+                chunk = []
+        if chunk:
+            _enqueue_pages(ctx, f"{base}/{parent_id}", chunk)
+    log_ddb(actor="worker", action="ITEM_SPLIT", pk=str(job_id), payload={
+        "item_id": str(parent_id), "pages": n})
+    print(f"[SPLIT] job={job_id} item={parent_id} kind={kind} pages={n}")
+    return True
+
+def _enqueue_pages(ctx, prefix: str, pages: list):
+    # sobe as páginas, cria os itens num INSERT e enfileira (o OCR começa antes do fim do split)
+    uploads, items = [], []
+    for page_no, png in pages:
+        key = f"{prefix}/p{page_no:05d}.png"
+        uploads.append((key, png, "image/png"))
+        items.append(JobItem(job_id=ctx["job_id"], parent_id=ctx["item_id"], page_number=page_no,
+                             s3_key=key, status="PENDING",
+                             content_sha256=hashlib.sha256(png).hexdigest()))
+    with span("s3_upload"):
+        upload_s3_many(ctx["bucket"], uploads)
+    JobItem.objects.bulk_create(items)
+    with span("enqueue"):
+        enqueue_items([{
+            "job_id": str(ctx["job_id"]),
+            "item_id": str(it.id),
+            "s3_bucket": ctx["bucket"],
+            "s3_key": it.s3_key,
+            "sha256": it.content_sha256,
+            "ocr_engine": ctx["engine"],
+            "ocr_language": ctx["lang"],
+            "created_at": ctx["created_at"],
+            "stage": "ocr",
+            "parent_id": str(ctx["item_id"]),
+            "doc_sha256": ctx["sha"],  # _assemble grava o texto do documento no cache com ele
+            "page_number": it.page_number,
+            "lane": ctx["lane"],
+        } for it in items], queue_url=queue_url_for(ctx["lane"]))
+
+def _bump_document(ctx, n: int = 1):
+    """Conta n páginas no documento; quem fecha a conta junta o texto."""
+    parent_id = ctx["parent_id"]
+    JobItem.objects.filter(id=parent_id).update(pages_done=F("pages_done") + n, updated_at=timezone.now())
+    doc = JobItem.objects.filter(id=parent_id).values("pages_done", "pages_total").first()
+    if doc and doc["pages_done"] >= doc["pages_total"]:
+        _assemble(ctx)
+
+def _assemble(ctx):
+    parent_id, job_id = ctx["parent_id"], ctx["job_id"]
+    pages = list(JobItem.objects.filter(parent_id=parent_id).order_by("page_number")
+                 .values_list("page_number", "status", "ocr_text"))
+    failed = [n for n, st, _ in pages if st != "DONE"]
+    text = "\n\n".join(t for _, st, t in pages if st == "DONE" and t)
+    err = f"OCR falhou nas páginas: {', '.join(map(str, failed))}" if failed else None
+    updated = JobItem.objects.filter(id=parent_id).exclude(status="DONE").update(
+        ocr_text=text, error_msg=err, status="DONE", updated_at=timezone.now())
+    if not updated:
+        return
+    bump_job_done(job_id)
+    sha = ctx.get("doc_sha")  # calculado pelo worker no split (mensagem antiga sem ele: não grava)
+    if sha and not failed:
+        ocr_cache.store(sha, text, ctx["engine"], ctx["lang"])
+    print(f"[DOC_DONE] job={job_id} item={parent_id} pages={len(pages)} failed={len(failed)}")
+
+def _split_or_skip(ctx) -> bool:
+    """True = mensagem resolvida pelo split (documento fora do cache com várias páginas)."""
+    return ctx["stage"] == "split" and ctx["text"] is None and handle_split(ctx)
+
+def process_message(msg):
+    ctx = _begin(msg)
+    if ctx is None:
         return
 
     # OCR
     try:
-        text = mock_ocr(raw) # Agora esta função usa EasyOCR
-        with transaction.atomic():
-            it = JobItem.objects.select_for_update().get(id=item_id)
-            it.ocr_text = text
-            it.status = "DONE"
-            it.save(update_fields=["ocr_text", "status"])
-            # tenta marcar o job DONE se todos concluidos
-            set_job_status_if_complete(it.job)
-        print(f"[DONE] job={job_id} item={item_id} text='{text[:60]}'")
+        if _split_or_skip(ctx):
+            return
+        if ctx["text"] is None:
+            with span("ocr"):
+                text = ocr_image(ctx["raw"], get_engine(ctx["engine"], ctx["lang"]))
+            _set_text(ctx, text)
+        _mark_done(ctx)
+    except Exception as e:
+        _mark_error(ctx, e)
+
+def _ocr_text(c):
+    """Texto do item: cache, resultado do lote ou OCR item a item."""
+    if c["text"] is None:
+        text = c.get("ocr_batch_text")
+        if text is None:
+            with span("ocr"):
+                text = ocr_image(c["raw"], get_engine(c["engine"], c["lang"]))
+        _set_text(c, text)
+
+def claim_batch(msgs: list):
+    """_claim do lote inteiro; None (cada mensagem reivindica no _begin) se o lote falhar."""
+    try:
+        return _claim([json.loads(m["Body"])["item_id"] for m in msgs])
+    except Exception as e:
+        # corpo inválido ou banco fora: cada mensagem tenta sozinha no _begin
+        print(f"[CLAIM] lote falhou ({type(e).__name__}: {e}); item a item")
+        return None
+
+def process_batch(msgs: list, committer=None, live: set = None) -> list:
+    """
+    Processa várias mensagens com um único readtext_batched (itens fora do
+    cache). Retorna [(msg, ok, err)]: ok=False mantém a mensagem na fila.
+    Com `committer` (GroupBuffer de commit_results) os resultados de OCR vão
+    para o buffer e ficam fora do retorno: o (msg, ok, err) deles sai no
+    callback do commit. `live`: resultado de claim_batch feito por quem
+    recebeu as mensagens (senão o lote é reivindicado aqui).
+    """
+    status = {}
+    ctxs = []
+    if live is None and len(msgs) > 1:
+        live = claim_batch(msgs)
+    for m in msgs:
+        try:
+            ctx = _begin(m, live)
+        except Exception as e:
+            traceback.print_exc()
+            status[m["MessageId"]] = (False, f"{type(e).__name__}: {e}")
+            continue
+        if ctx is None:
+            status[m["MessageId"]] = (True, None)
+            continue
+        try:
+            if _split_or_skip(ctx):
+                status[m["MessageId"]] = (True, None)
+                continue
+        except Exception as e:
+            _mark_error(ctx, e)
+            status[m["MessageId"]] = (True, None)
+            continue
+        ctxs.append(ctx)
+
+    # um lote por (motor, idioma): cada um usa o seu modelo
+    todo = {}
+    for c in ctxs:
+        if c["text"] is None:
+            todo.setdefault((c["engine"], c["lang"]), []).append(c)
+    for (engine, lang), group in todo.items():
+        if len(group) < 2:
+            continue
+        try:
+            with span("ocr_batch"):
+                texts = ocr_batch([c["raw"] for c in group], get_engine(engine, lang))
+            for c, text in zip(group, texts):
+                c["ocr_batch_text"] = text
+        except Exception as e:
+            # um arquivo ruim derruba o lote: cai para o OCR item a item abaixo
+            print(f"[BATCH] readtext_batched falhou ({type(e).__name__}: {e}); OCR item a item")
+
+    for c in ctxs:
+        mid = c["msg"]["MessageId"]
+        if committer is not None:
+            err = None
+            try:
+                _ocr_text(c)
+            except Exception as e:
+                traceback.print_exc()
+                err = e
+            committer.add((c, err))
+            continue
+        try:
+            try:
+                _ocr_text(c)
+                _mark_done(c)
+            except Exception as e:
+                _mark_error(c, e)
+            status[mid] = (True, None)
+        except Exception as e:
+            traceback.print_exc()
+            status[mid] = (False, f"{type(e).__name__}: {e}")
+
+    return [(m, *status[m["MessageId"]]) for m in msgs if m["MessageId"] in status]
+
+# ==============================================================================
+# Group commit: os resultados de vários itens vão numa transação só
+# (bulk_update + contadores por job/documento) e as mensagens são
+# confirmadas com delete_message_batch depois do commit.
+# COMMIT_MAX_ITEMS=1 volta a gravar item a item.
+# ==============================================================================
+COMMIT_MAX_ITEMS = int(os.getenv("COMMIT_MAX_ITEMS", "50"))    # itens por transação
+COMMIT_MAX_WAIT = float(os.getenv("COMMIT_MAX_WAIT", "0.2"))   # s que um resultado espera o grupo
+ACK_MAX_WAIT = float(os.getenv("ACK_MAX_WAIT", "0.2"))         # s que um ack espera completar 10
+
+
+def commit_results(entries: list, on_done):
+    """
+    Grava [(ctx, erro ou None)] numa transação e chama on_done(msg, ok, err)
+    para cada mensagem depois do commit. Se a transação falhar, grava item a
+    item (_mark_done/_mark_error); o que falhar também fica na fila.
+    """
+    by_id = {str(c["item_id"]): (c, err) for c, err in entries}  # reentregue no mesmo grupo: 1 vez
+    now = timezone.now()
+    written = []
+    try:
+        with transaction.atomic(), span("db_commit"):
+            # escreve antes de ler: trava as linhas no Postgres (a mesma mensagem em dois
+            # workers não conta duas vezes) e pega o lock de escrita do SQLite já no início
+            ids = sorted(by_id)
+            JobItem.objects.filter(id__in=ids).exclude(status="DONE").update(updated_at=now)
+            current = {str(i): st for i, st in JobItem.objects.filter(id__in=ids).values_list("id", "status")}
+            done, failed, jobs, docs = [], [], {}, {}
+            for item_id, (c, err) in by_id.items():
+                st = current.get(item_id)
+                # como _mark_done/_mark_error: página e erro só saindo de um estado em aberto
+                # (página em ERROR já contou no documento); item avulso em ERROR pode virar DONE
+                if st not in OPEN_STATUSES and (err is not None or c.get("parent_id") or st != "ERROR"):
+                    continue  # apagado, expirado ou já gravado por outra entrega
+                if err is None:
+                    done.append(JobItem(id=item_id, status="DONE", ocr_text=c["text"], updated_at=now))
+                else:
+                    failed.append(JobItem(id=item_id, status="ERROR", error_msg=f"{type(err).__name__}: {err}",
+                                          updated_at=now))
+                written.append((c, err))
+                if c.get("parent_id"):
+                    # página (com ou sem erro) conta no documento, não no job
+                    docs.setdefault(c["parent_id"], [c, 0])[1] += 1
+                elif err is None:
+                    jobs[c["job_id"]] = jobs.get(c["job_id"], 0) + 1
+            if done:
+                JobItem.objects.bulk_update(done, ["status", "ocr_text", "updated_at"])
+            if failed:
+                JobItem.objects.bulk_update(failed, ["status", "error_msg", "updated_at"])
+            for job_id, n in jobs.items():
+                _bump_job_done(job_id, n)
+            for c, n in docs.values():
+                _bump_document(c, n)
     except Exception as e:
-        err = f"{type(e).__name__}: {e}"
-        with transaction.atomic():
-            it = JobItem.objects.select_for_update().get(id=item_id)
-            it.error_msg = err
-            it.status = "ERROR"
-            it.save(update_fields=["error_msg", "status"])
-        print(f"[ERROR] job={job_id} item={item_id} {err}")
+        print(f"[COMMIT] grupo de {len(entries)} falhou ({type(e).__name__}: {e}); gravando item a item")
         traceback.print_exc()
+        for c, err in entries:
+            try:
+                if err is None:
+                    _mark_done(c)
+                else:
+                    _mark_error(c, err)
+                on_done(c["msg"], True, None)
+            except Exception as e2:
+                on_done(c["msg"], False, f"{type(e2).__name__}: {e2}")
+        return
+
+    for c, err in written:
+        job_id, item_id = c["job_id"], c["item_id"]
+        if err is None:
+            metrics.count_item("cached" if c["cached"] else "done")
+            log_ddb(actor="worker", action="ITEM_DONE", pk=str(job_id), payload={
+                "item_id": str(item_id), "cached": c["cached"], "chars": len(c["text"])})
+            print(f"[DONE] job={job_id} item={item_id} text='{c['text'][:60]}'")
+        else:
+            metrics.count_item("error")
+            log_ddb(actor="worker", action="ITEM_ERROR", pk=str(job_id), payload={
+                "item_id": str(item_id), "error": f"{type(err).__name__}: {err}"})
+            print(f"[ERROR] job={job_id} item={item_id} {type(err).__name__}: {err}")
+    print(f"[COMMIT] itens={len(entries)} gravados={len(written)} jobs={len(jobs)} docs={len(docs)}")
+    for c, _ in entries:
+        on_done(c["msg"], True, None)
+
+
+def result_committer(on_done):
+    """GroupBuffer que grava os resultados com commit_results; None com COMMIT_MAX_ITEMS <= 1."""
+    if COMMIT_MAX_ITEMS <= 1:
+        return None
+    from committer import GroupBuffer
+    return GroupBuffer(lambda entries: commit_results(entries, on_done), COMMIT_MAX_ITEMS,
+                       COMMIT_MAX_WAIT, name="result-commit").start()
+
+# ==============================================================================
+# Modo pool: 1 poller (este processo) + WORKER_PROCESSES processos de OCR
+# (com AUTOSCALE_ENABLED=1 o tamanho do pool segue a fila, ver autoscale.py)
+# ==============================================================================
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+WORKER_PREFETCH = int(os.getenv("WORKER_PREFETCH", "2"))          # lotes em voo por processo
+OCR_TORCH_THREADS = int(os.getenv("OCR_TORCH_THREADS", "1"))      # threads do torch por processo
+# timeout base curto; o heartbeat estende enquanto a mensagem estiver em voo
+SQS_VISIBILITY_TIMEOUT = int(os.getenv("SQS_VISIBILITY_TIMEOUT", "60"))
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))     # 0 = sem endpoint
+METRICS_QUEUE_INTERVAL = float(os.getenv("METRICS_QUEUE_INTERVAL", "15"))
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", "0")) or None
+EXPIRE_SWEEP_INTERVAL = float(os.getenv("EXPIRE_SWEEP_INTERVAL", "0"))  # 0 = só pelo expire_jobs
+
+
+def _pool_worker_loop(tasks, results):
+    """Loop de cada processo de OCR do pool (roda no processo filho)."""
+    pid = os.getpid()
+    # Ctrl+C chega ao grupo todo: o filho sai pelo sentinela do shutdown, depois do flush
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # 1 processo por core: evita que os N processos disputem os mesmos cores
+    try:
+        import torch
+        torch.set_num_threads(OCR_TORCH_THREADS)
+    except Exception as e:
+        print(f"[POOL] torch.set_num_threads ignorado: {e}")
+    preload_engines()
+    # "done" só depois do commit do grupo: o processo principal confirma no SQS em seguida
+    committer = result_committer(lambda m, ok, err: results.put(("done", pid, m["MessageId"], ok, err)))
+
+    while True:
+        batch = tasks.get()
+        if batch is None:
+            break
+        results.put(("start", pid, [m["MessageId"] for m in batch], None, None))
+        for m, ok, err in process_batch(batch, committer):
+            results.put(("done", pid, m["MessageId"], ok, err))
+    if committer is not None:
+        committer.flush()
+    # processo filho sai sem rodar atexit: grava os eventos pendentes aqui
+    audit_log.flush()
+
+
+def ack_many(msgs: list):
+    """
+    delete_message_batch (até 10 por chamada, na fila de onde cada uma veio)
+    + latência fila->DONE (SentTimestamp do SQS).
+    """
+    by_queue = {}
+    for m in msgs:
+        by_queue.setdefault(m["QueueUrl"], []).append(m)
+    for url, group in by_queue.items():
+        for i in range(0, len(group), 10):
+            chunk = group[i:i + 10]
+            try:
+                with span("sqs_ack"):
+                    resp = sqs.delete_message_batch(QueueUrl=url, Entries=[
+                        {"Id": str(j), "ReceiptHandle": m["ReceiptHandle"]} for j, m in enumerate(chunk)])
+            except Exception as e:
+                # volta para a fila depois do visibility timeout; o item já está gravado e a reentrega é ignorada
+                print(f"[ACK] delete_message_batch falhou ({type(e).__name__}: {e}) msgs={len(chunk)}")
+                continue
+            for f in resp.get("Failed", []):
+                print(f"[ACK] falhou msg={chunk[int(f['Id'])]['MessageId']}: {f.get('Code')}")
+    now = time.time()
+    for m in msgs:
+        sent = m.get("Attributes", {}).get("SentTimestamp")
+        if sent:
+            metrics.observe_queue_to_done(now - int(sent) / 1000, m.get("Lane", "bulk"))
+    print(f"[ACK] deleted {len(msgs)}")
+
+
+def acker():
+    """GroupBuffer de acks: delete_message_batch com até 10 ou depois de ACK_MAX_WAIT s."""
+    from committer import GroupBuffer
+    return GroupBuffer(ack_many, 10, ACK_MAX_WAIT, name="sqs-ack").start()
+
+
+def main_pool(poller, heartbeat):
+    from pool import OcrWorkerPool
+    import autoscale
+
+    meter = autoscale.ThroughputMeter()
+    acks = acker()
+
+    def on_done(msg, ok, err):
+        heartbeat.untrack(msg)
+        if ok:
+            meter.record()
+            acks.add(msg)
+        else:
+            # não deleta: a mensagem volta para a fila quando o visibility timeout expirar
+            print(f"[FAIL] mantendo na fila msg={msg['MessageId']}: {err}")
+
+    pool = OcrWorkerPool(_pool_worker_loop, WORKER_PROCESSES, WORKER_PREFETCH, on_done=on_done,
+                         batch_size=OCR_BATCH_SIZE)
+    pool.start()
+    if autoscale.AUTOSCALE_ENABLED:
+        # alvo calculado pela fila; o pool começa em WORKER_PROCESSES
+        policy = autoscale.ScalingPolicy(
+            autoscale.AUTOSCALE_SLA_SECONDS, autoscale.AUTOSCALE_MIN_PROCESSES,
+            autoscale.AUTOSCALE_MAX_PROCESSES,
+            autoscale.AUTOSCALE_DEFAULT_RATE, autoscale.AUTOSCALE_COOLDOWN)
+        autoscale.AutoscaleController(
+            policy, meter, autoscale.sqs_queue_stats(sqs, poller.queue_urls),
+            autoscale.pool_applier(pool), pool.processes, autoscale.AUTOSCALE_INTERVAL,
+        ).start()
+    try:
+        while True:
+            # prefetch: continua buscando enquanto houver vaga, mesmo com OCR rodando
+            n = pool.acquire(10)  # SQS entrega no máximo 10 por receive
+            if not n:
+                continue
+            msgs = poller.receive(n)  # long polling (ver lanes.py)
+            pool.release(n - len(msgs))
+            if not msgs:
+                if not pool.inflight():
+                    time.sleep(2)
+                continue
+            for m in msgs:
+                # pré-buscadas também contam: podem esperar na fila interna
+                heartbeat.track(m)
+            pool.submit(msgs)
+    finally:
+        pool.shutdown()
+        acks.flush()
+
 
 def main():
-    queue_url = settings.SQS_QUEUE_URL
-    assert queue_url, "SQS_QUEUE_URL vazio no .env"
+    assert settings.SQS_QUEUE_URL, "SQS_QUEUE_URL vazio no .env"
+    from lanes import LanePoller, configured_lanes
+    poller = LanePoller(sqs, configured_lanes(settings), SQS_VISIBILITY_TIMEOUT)
+    lanes = " ".join(f"{name}={url}(w={w})" for name, url, w in poller.lanes)
+
+    print(f"[WORKER] start lanes: {lanes} processes={WORKER_PROCESSES}")
+    from heartbeat import VisibilityHeartbeat
+    heartbeat = VisibilityHeartbeat(sqs, settings.SQS_QUEUE_URL, SQS_VISIBILITY_TIMEOUT, HEARTBEAT_INTERVAL).start()
+    metrics.start_server(WORKER_METRICS_PORT)
+    for i, (name, url, _) in enumerate(poller.lanes):
+        metrics.watch_queue(sqs, url, inflight=(lambda: len(heartbeat)) if i == 0 else None,
+                            interval=METRICS_QUEUE_INTERVAL, lane=name)
+    if EXPIRE_SWEEP_INTERVAL > 0:
+        from app.jobs import expiry
+        expiry.start_sweeper(EXPIRE_SWEEP_INTERVAL)
+    if _POOLED:
+        return main_pool(poller, heartbeat)
+
+    preload_engines()
+    acks = acker()
 
-    print(f"[WORKER] start queue={queue_url}")
+    def settle(m, ok, err):
+        # resultado gravado (ou mensagem sem nada a fazer): confirma no SQS em lote
+        heartbeat.untrack(m)
+        if ok:
+            acks.add(m)
+        else:
+            print(f"[FAIL] mantendo na fila: {err}")
+
+    committer = result_committer(settle)
+    try:
+        _main_loop(poller, heartbeat, committer, settle)
+    finally:
+        if committer is not None:
+            committer.flush()
+        acks.flush()
+
+def _main_loop(poller, heartbeat, committer, settle):
     while True:
-        resp = sqs.receive_message(
-            QueueUrl=queue_url,
-            MaxNumberOfMessages=5,
-            WaitTimeSeconds=20,  # long polling
-            VisibilityTimeout=60
-        )
-        msgs = resp.get("Messages", [])
+        msgs = receive_batch(poller, max(5, OCR_BATCH_SIZE))
         if not msgs:
-            # pouca movimentação: dorme um tico
-            time.sleep(2)
+            # pouca movimentação: dorme um tico (com lanes o poller já esperou no long poll
+            # curto; dormir aqui atrasaria o job pequeno que chegar)
+            if len(poller.lanes) == 1:
+                time.sleep(2)
             continue
 
         for m in msgs:
-            receipt = m["ReceiptHandle"]
-            try:
-                process_message(m)
-                sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=receipt)
-                print(f"[ACK] deleted")
-            except Exception as e:
-                print(f"[FAIL] mantendo na fila: {e}")
-                traceback.print_exc()
+            heartbeat.track(m)
+        live = claim_batch(msgs)  # um UPDATE para tudo o que veio do receive
+        for i in range(0, len(msgs), OCR_BATCH_SIZE):
+            for m, ok, err in process_batch(msgs[i:i + OCR_BATCH_SIZE], committer, live):
+                settle(m, ok, err)
+
+def receive_batch(poller, n: int) -> list:
+    """Junta até n mensagens (o SQS entrega no máximo 10 por receive)."""
+    msgs = []
+    while len(msgs) < n:
+        # long polling só na 1a chamada
+        got = poller.receive(n - len(msgs), wait=0 if msgs else None)
+        if not got:
+            break
+        msgs.extend(got)
+    return msgs
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,198 @@
+"""
+Pool de processos de OCR alimentado por um único poller SQS.
+
+O processo principal faz o long polling e distribui lotes de mensagens numa
+fila (multiprocessing) para N processos de OCR. Cada processo avisa quando
+pega um lote ("start") e quando termina cada mensagem ("done"), e uma thread
+do processo principal faz o ack (delete_message) ou deixa a mensagem voltar
+para a fila.
+"""
+import os, time, threading, traceback
+import multiprocessing as mp
+
+
+class OcrWorkerPool:
+    def __init__(self, target, processes: int, prefetch: int = 2, on_done=None, batch_size: int = 1):
+        # target(tasks, results) roda em cada processo filho (ver main._pool_worker_loop)
+        # on_done(msg, ok, err) roda no processo principal quando o item termina
+        self.target = target
+        self.processes = max(1, processes)
+        self.prefetch = max(1, prefetch)
+        self.batch_size = max(1, batch_size)
+        self.on_done = on_done
+        # "spawn": cada processo sobe limpo (sem herdar threads do torch / conexões do DB)
+        self._ctx = mp.get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._procs = []
+        self._lock = threading.Lock()
+        self._inflight = {}       # msg_id -> msg
+        self._owner = {}          # pid -> {msg_id} do lote em processamento
+        self._slots = threading.Semaphore(self.capacity)
+        self._slot_debt = 0       # vagas a recolher depois de um resize para baixo
+        self._retiring = 0        # processos que vão sair ao pegar o sentinela None
+        self._stop = threading.Event()
+        self._closing = threading.Event()  # shutdown: processo que sai não é reposto
+        self._collector = None
+
+    @property
+    def capacity(self) -> int:
+        # mensagens em voo = processando + pré-buscadas esperando na fila interna
+        return self.processes * self.prefetch * self.batch_size
+
+    def start(self):
+        for _ in range(self.processes):
+            self._spawn()
+        self._collector = threading.Thread(target=self._collect_loop, name="pool-collector", daemon=True)
+        self._collector.start()
+        print(f"[POOL] start processes={self.processes} prefetch={self.prefetch} "
+              f"batch={self.batch_size} capacity={self.capacity}")
+
+    def _spawn(self):
+        p = self._ctx.Process(target=self.target, args=(self._tasks, self._results), daemon=True)
+        p.start()
+        self._procs.append(p)
+        print(f"[POOL] processo OCR iniciado pid={p.pid}")
+
+    def acquire(self, max_n: int, timeout: float = 1.0) -> int:
+        """Reserva até max_n vagas (bloqueia até haver ao menos uma). Retorna quantas reservou."""
+        if not self._slots.acquire(timeout=timeout):
+            return 0
+        n = 1
+        while n < max_n and self._slots.acquire(blocking=False):
+            n += 1
+        return n
+
+    def release(self, n: int):
+        for _ in range(n):
+            self._release_slot()
+
+    def _release_slot(self):
+        # depois de encolher, as vagas devolvidas pagam a dívida em vez de voltar ao semáforo
+        with self._lock:
+            if self._slot_debt:
+                self._slot_debt -= 1
+                return
+        self._slots.release()
+
+    def resize(self, processes: int):
+        """Muda o número de processos de OCR. Quem sai termina o lote atual antes."""
+        processes = max(1, processes)
+        with self._lock:
+            delta = processes - self.processes
+            if not delta:
+                return
+            self.processes = processes
+        slots = abs(delta) * self.prefetch * self.batch_size
+        if delta > 0:
+            for _ in range(delta):
+                self._spawn()
+            for _ in range(slots):
+                self._release_slot()
+        else:
+            with self._lock:
+                self._retiring += -delta
+            for _ in range(-delta):
+                self._tasks.put(None)
+            for _ in range(slots):
+                if not self._slots.acquire(blocking=False):
+                    with self._lock:
+                        self._slot_debt += 1
+        print(f"[POOL] resize processes={processes} capacity={self.capacity}")
+
+    def submit(self, msgs: list):
+        # as vagas precisam ter sido reservadas com acquire(); um lote vai inteiro para um processo
+        for i in range(0, len(msgs), self.batch_size):
+            batch = msgs[i:i + self.batch_size]
+            with self._lock:
+                for m in batch:
+                    self._inflight[m["MessageId"]] = m
+            self._tasks.put(batch)
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def _finish(self, msg_id: str, ok: bool, err):
+        with self._lock:
+            msg = self._inflight.pop(msg_id, None)
+        if msg is None:
+            return
+        try:
+            if self.on_done:
+                self.on_done(msg, ok, err)
+        except Exception as e:
+            print(f"[POOL] on_done falhou: {e}")
+            traceback.print_exc()
+        finally:
+            self._release_slot()
+
+    def _collect_loop(self):
+        last_reap = time.time()
+        while not self._stop.is_set():
+            if time.time() - last_reap > 2.0:
+                self._reap()
+                last_reap = time.time()
+            try:
+                result = self._results.get(timeout=1.0)
+            except Exception:
+                continue
+            self._handle(result)
+
+    def _handle(self, result):
+        kind, pid, msg_id, ok, err = result
+        if kind == "start":
+            # soma: com group commit o lote anterior pode ainda estar esperando o commit
+            with self._lock:
+                self._owner.setdefault(pid, set()).update(msg_id)
+        elif kind == "done":
+            with self._lock:
+                self._owner.get(pid, set()).discard(msg_id)
+            self._finish(msg_id, ok, err)
+
+    def _reap(self):
+        # processo morto (ex.: OOM no OCR): libera as vagas das mensagens que ele
+        # segurava (elas voltam para a fila pelo visibility timeout) e sobe outro.
+        for p in list(self._procs):
+            if p.is_alive() or self._closing.is_set():
+                continue
+            self._procs.remove(p)
+            with self._lock:
+                msg_ids = self._owner.pop(p.pid, set())
+                retired = p.exitcode == 0 and self._retiring > 0
+                if retired:
+                    self._retiring -= 1
+            if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+                from prometheus_client import multiprocess
+                multiprocess.mark_process_dead(p.pid)
+            if retired:
+                # saiu por resize: não repõe
+                print(f"[POOL] processo pid={p.pid} encerrado (resize)")
+                continue
+            print(f"[POOL] processo pid={p.pid} morreu exitcode={p.exitcode} msgs={len(msg_ids)}")
+            for msg_id in msg_ids:
+                self._finish(msg_id, False, f"processo {p.pid} morreu (exitcode={p.exitcode})")
+            self._spawn()
+
+    def shutdown(self, timeout: float = 30.0):
+        """
+        Sentinelas primeiro e o coletor continua lendo enquanto os processos
+        terminam: os "done" do flush final (group commit) chegam e são
+        confirmados, e nenhum filho trava com o pipe de resultados cheio.
+        """
+        self._closing.set()
+        for _ in self._procs:
+            self._tasks.put(None)
+        deadline = time.time() + timeout
+        for p in self._procs:
+            p.join(max(0.0, deadline - time.time()))
+        self._stop.set()
+        if self._collector is not None:
+            self._collector.join(2.0)
+        while True:  # o que chegou depois da última leitura do coletor
+            try:
+                result = self._results.get(timeout=0.1)
+            except Exception:
+                break
+            self._handle(result)
+        print(f"[POOL] shutdown inflight={self.inflight()}")
@@ -0,0 +1,136 @@
+"""
+Pré-processamento antes do OCR.
+
+Etapas (todas configuráveis por env):
+  1. decode + orientação EXIF (fotos de celular vêm "deitadas")
+  2. escala de cinza
+  3. redução: pela altura de texto estimada (PREPROC_TARGET_TEXT_PX) e/ou
+     pelo maior lado (PREPROC_MAX_SIDE). Nunca aumenta a imagem.
+  4. tiles opcionais para scans muito grandes (PREPROC_TILE_SIDE)
+
+Retorna os arrays prontos para o EasyOCR e o tempo (ms) de cada etapa.
+Imagem que declara mais de PREPROC_MAX_PIXELS pixels é recusada antes do
+decode (DecompressionBombError): poucos KB de PNG podem pedir GBs de RAM, e
+o erro vira ERROR do item em vez de derrubar o processo a cada reentrega.
+"""
+import io, os, time
+import numpy as np
+from PIL import Image, ImageOps
+
+# ~A3 a 600 dpi cabe com folga; acima disso (e do dobro, no Pillow) é recusado
+PREPROC_MAX_PIXELS = int(os.getenv("PREPROC_MAX_PIXELS", "150000000"))
+Image.MAX_IMAGE_PIXELS = PREPROC_MAX_PIXELS
+
+
+def check_pixels(img: Image.Image, limit: int = PREPROC_MAX_PIXELS):
+    """Recusa pelo tamanho declarado no cabeçalho (o Pillow só avisa entre 1x e 2x o limite)."""
+    if limit and img.width * img.height > limit:
+        raise Image.DecompressionBombError(
+            f"imagem de {img.width}x{img.height} px passa de PREPROC_MAX_PIXELS={limit}")
+
+
+class PreprocessConfig:
+    def __init__(self, grayscale=True, max_side=2560, target_text_px=0, tile_side=0, tile_overlap=64):
+        self.grayscale = grayscale
+        self.max_side = max_side              # 0 = sem limite
+        self.target_text_px = target_text_px  # 0 = não estima altura de texto
+        self.tile_side = tile_side            # 0 = sem tiles
+        self.tile_overlap = tile_overlap
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            grayscale=os.getenv("PREPROC_GRAYSCALE", "1") == "1",
+            max_side=int(os.getenv("PREPROC_MAX_SIDE", "2560")),
+            target_text_px=int(os.getenv("PREPROC_TARGET_TEXT_PX", "0")),
+            tile_side=int(os.getenv("PREPROC_TILE_SIDE", "0")),
+            tile_overlap=int(os.getenv("PREPROC_TILE_OVERLAP", "64")),
+        )
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+def estimate_text_height(gray: np.ndarray) -> float:
+    """
+    Altura mediana das linhas de texto (px) pelo perfil de projeção
+    horizontal. 0 quando não dá para estimar (foto sem texto corrido etc.).
+    """
+    ink = gray < (gray.mean() - gray.std() * 0.5)
+    rows = ink.mean(axis=1) > 0.01
+    heights, run = [], 0
+    for r in rows:
+        if r:
+            run += 1
+        elif run:
+            heights.append(run)
+            run = 0
+    if run:
+        heights.append(run)
+    heights = [h for h in heights if h >= 4]
+    return float(np.median(heights)) if len(heights) >= 3 else 0.0
+
+
+def _tiles(img: Image.Image, side: int, overlap: int) -> list:
+    w, h = img.size
+    if side <= 0 or (w <= side and h <= side):
+        return [img]
+    step = max(1, side - overlap)
+    out = []
+    for top in range(0, max(1, h - overlap), step):
+        for left in range(0, max(1, w - overlap), step):
+            out.append(img.crop((left, top, min(w, left + side), min(h, top + side))))
+    return out
+
+
+def preprocess(raw: bytes, cfg: PreprocessConfig = None):
+    """bytes -> ([np.ndarray, ...], {"etapa": ms, ...})"""
+    cfg = cfg or PreprocessConfig.from_env()
+    timings = {}
+
+    t = time.perf_counter()
+    img = Image.open(io.BytesIO(raw))
+    check_pixels(img)
+    if cfg.max_side and img.format == "JPEG" and max(img.size) > cfg.max_side:
+        # o decoder JPEG já reduz (1/2, 1/4, 1/8) sem ficar abaixo do max_side: decode bem mais barato
+        s = cfg.max_side / max(img.size)
+        img.draft("L" if cfg.grayscale else "RGB", (int(img.width * s) + 1, int(img.height * s) + 1))
+    img.load()
+    timings["decode_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    img = ImageOps.exif_transpose(img)
+    timings["exif_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    img = img.convert("L" if cfg.grayscale else "RGB")
+    timings["gray_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    scale = 1.0
+    if cfg.target_text_px:
+        # estima numa miniatura (barato) e converte para a escala original
+        thumb_scale = min(1.0, 1024 / max(img.size))
+        thumb = img.convert("L").resize((max(1, int(img.width * thumb_scale)),
+                                         max(1, int(img.height * thumb_scale))))
+        text_h = estimate_text_height(np.asarray(thumb)) / thumb_scale
+        if text_h > cfg.target_text_px:
+            scale = cfg.target_text_px / text_h
+    if cfg.max_side and max(img.size) * scale > cfg.max_side:
+        scale = cfg.max_side / max(img.size)
+    if scale < 1.0:
+        img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))),
+                         Image.LANCZOS, reducing_gap=3.0)
+    timings["resize_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    tiles = _tiles(img, cfg.tile_side, cfg.tile_overlap)
+    arrays = []
+    for tile in tiles:
+        a = np.asarray(tile)
+        # EasyOCR trata arrays de 3 canais como BGR (OpenCV)
+        arrays.append(a if a.ndim == 2 else np.ascontiguousarray(a[:, :, ::-1]))
+    timings["tile_ms"] = (time.perf_counter() - t) * 1000
+    timings["scale"] = round(scale, 4)
+    timings["tiles"] = len(arrays)
+    return arrays, timings
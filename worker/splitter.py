@@ -0,0 +1,75 @@
+"""
+Divide documentos de várias páginas (PDF, TIFF) em uma imagem PNG por página.
+
+PDF é renderizado com pypdfium2 (opcional: pip install pypdfium2) em
+SPLIT_PDF_DPI; TIFF usa o próprio Pillow. As páginas são geradas uma a
+uma (generator) para não segurar o documento inteiro renderizado na memória.
+Página de PDF com MediaBox enorme é renderizada numa escala menor, até
+SPLIT_MAX_PAGE_PIXELS; TIFF fica com o limite de pixels do Pillow.
+"""
+import io, math, os
+from PIL import Image, ImageSequence
+
+SPLIT_PDF_DPI = int(os.getenv("SPLIT_PDF_DPI", "200"))
+SPLIT_MAX_PAGES = int(os.getenv("SPLIT_MAX_PAGES", "2000"))
+SPLIT_MAX_PAGE_PIXELS = int(os.getenv("SPLIT_MAX_PAGE_PIXELS", "50000000"))  # A4 a 200 dpi ~ 4 Mpx
+
+
+def doc_kind(key: str):
+    """"pdf" / "tiff" pela extensão da chave no S3; None = imagem simples."""
+    ext = key.rsplit(".", 1)[-1].lower() if "." in key else ""
+    return {"pdf": "pdf", "tif": "tiff", "tiff": "tiff"}.get(ext)
+
+
+def _png(img: Image.Image) -> bytes:
+    if img.mode not in ("1", "L", "RGB"):
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, "PNG", compress_level=1)  # rápido: a página só vive até o OCR
+    return buf.getvalue()
+
+
+def _pdf_scale(page) -> float:
+    """SPLIT_PDF_DPI, reduzido se a página (em pontos) passaria de SPLIT_MAX_PAGE_PIXELS."""
+    scale = SPLIT_PDF_DPI / 72
+    w, h = page.get_size()
+    if SPLIT_MAX_PAGE_PIXELS and w * h * scale * scale > SPLIT_MAX_PAGE_PIXELS:
+        scale = math.sqrt(SPLIT_MAX_PAGE_PIXELS / (w * h))
+        print(f"[SPLIT] página de {w:.0f}x{h:.0f} pt renderizada em {scale * 72:.0f} dpi")
+    return scale
+
+
+def count_pages(raw: bytes, kind: str) -> int:
+    if kind == "pdf":
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(raw)
+        try:
+            n = len(pdf)
+        finally:
+            pdf.close()
+    else:
+        with Image.open(io.BytesIO(raw)) as img:
+            n = getattr(img, "n_frames", 1)
+    return min(n, SPLIT_MAX_PAGES)
+
+
+def iter_pages(raw: bytes, kind: str):
+    """Gera (número da página a partir de 1, PNG bytes)."""
+    if kind == "pdf":
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(raw)
+        try:
+            for i in range(min(len(pdf), SPLIT_MAX_PAGES)):
+                page = pdf[i]
+                bitmap = page.render(scale=_pdf_scale(page))
+                yield i + 1, _png(bitmap.to_pil())
+                bitmap.close()
+                page.close()
+        finally:
+            pdf.close()
+        return
+    with Image.open(io.BytesIO(raw)) as img:
+        for i, frame in enumerate(ImageSequence.Iterator(img)):
+            if i >= SPLIT_MAX_PAGES:
+                break
+            yield i + 1, _png(frame.copy())